@@ -0,0 +1,325 @@
+import gzip
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+
+import click
+from flask import Blueprint, Response, current_app, request
+from flask.cli import AppGroup
+from sqlalchemy import JSON, Boolean, Date, DateTime, Float, Integer, Numeric
+
+# OpenAPI type of each column type; anything else is a string
+_COLUMN_TYPES = (
+    (Boolean, {'type': 'boolean'}),
+    (Integer, {'type': 'integer'}),
+    ((Float, Numeric), {'type': 'number'}),
+    (DateTime, {'type': 'string', 'format': 'date-time'}),
+    (Date, {'type': 'string', 'format': 'date'}),
+    (JSON, {'type': 'object'}),
+)
+
+_PATH_PARAM_TYPES = {'IntegerConverter': 'integer', 'FloatConverter': 'number'}
+
+_BEARER = [{'Bearer': []}]
+
+apidocs_bp = Blueprint('apidocs', __name__)
+
+
+def swag_from(specs):
+    """
+    Attach an OpenAPI operation object to a resource method.
+
+    Stores the dict where Flasgger's ``swag_from`` would, without importing
+    Flasgger, so the spec can be built in processes that do not serve docs.
+    """
+    def decorator(fn):
+        fn.specs_dict = specs
+        return fn
+    return decorator
+
+
+def _column_schema(column):
+    for types, schema in _COLUMN_TYPES:
+        if isinstance(column.type, types):
+            return dict(schema)
+    return {'type': 'string'}
+
+
+def model_schema(model, fields, required=()):
+    """JSON schema of a model restricted to ``fields``."""
+    columns = model.__table__.c
+    schema = {'type': 'object', 'properties': {field: _column_schema(columns[field]) for field in fields}}
+    if required:
+        schema['required'] = list(required)
+    return schema
+
+
+def _error_responses(*codes):
+    descriptions = {
+        400: 'Invalid request', 401: 'Missing or invalid token', 403: 'Admin only',
+        404: 'Not found', 429: 'Too many requests',
+    }
+    return {code: {'description': descriptions[code]} for code in codes}
+
+
+def crud_docs(spec):
+    """
+    OpenAPI operations of a ``crud_resource``, keyed by method name.
+
+    Args:
+        spec (CrudSpec): The resource's declaration.
+
+    Returns:
+        dict: ``{'get': {...}, 'post': {...}, 'put': {...}, 'delete': {...}}``.
+    """
+    name = spec.model.__name__
+    tags = [spec.label]
+    definitions = {
+        name: model_schema(spec.model, spec.fields),
+        f'{name}Input': model_schema(spec.model, spec.writable, spec.required),
+    }
+    ref = {'$ref': f'#/definitions/{name}'}
+    body = [{'name': 'body', 'in': 'body', 'required': True, 'schema': {'$ref': f'#/definitions/{name}Input'}}]
+    fields = {'name': 'fields', 'in': 'query', 'type': 'string',
+              'description': f"Comma separated subset of: {', '.join(spec.fields)}"}
+    return {
+        'get': {
+            'tags': tags, 'summary': f'List or view {spec.label} items', 'definitions': definitions,
+            'parameters': [
+                fields,
+                {'name': 'limit', 'in': 'query', 'type': 'integer', 'description': 'Page size (lists); without limit or after the whole list is returned'},
+                {'name': 'after', 'in': 'query', 'type': 'integer', 'description': 'Cursor from X-Next-Cursor (lists)'},
+                {'name': 'stream', 'in': 'query', 'type': 'integer', 'description': '1 streams the whole list (lists)'},
+            ],
+            'responses': {200: {'description': f'One {spec.label} or a page of them', 'schema': ref},
+                          304: {'description': 'Not modified'}, **_error_responses(400, 404)},
+        },
+        'post': {
+            'tags': tags, 'summary': f'Create a {spec.label}', 'security': _BEARER, 'parameters': body,
+            'responses': {201: {'description': 'Created'}, **_error_responses(400, 401, 403)},
+        },
+        'put': {
+            'tags': tags, 'summary': f'Update a {spec.label}', 'security': _BEARER, 'parameters': body,
+            'responses': {200: {'description': 'Updated'}, **_error_responses(400, 401, 403, 404)},
+        },
+        'delete': {
+            'tags': tags, 'summary': f'Delete a {spec.label}', 'security': _BEARER,
+            'responses': {200: {'description': 'Deleted'}, **_error_responses(401, 403, 404)},
+        },
+    }
+
+
+def bulk_docs(spec):
+    """OpenAPI operations of a ``bulk_resource``, keyed by method name."""
+    name = spec.model.__name__
+    tags = [spec.label]
+    items = {'type': 'array', 'items': {'$ref': f'#/definitions/{name}Input'}}
+    results = {'description': 'Per-item results'}
+    return {
+        'post': {
+            'tags': tags, 'summary': f'Create many {spec.label} items', 'security': _BEARER,
+            'consumes': ['application/json', 'application/x-ndjson'],
+            'parameters': [{'name': 'body', 'in': 'body', 'required': True, 'schema': items}],
+            'responses': {201: results, **_error_responses(400, 401, 403)},
+        },
+        'put': {
+            'tags': tags, 'summary': f'Update many {spec.label} items (each with its id)', 'security': _BEARER,
+            'consumes': ['application/json', 'application/x-ndjson'],
+            'parameters': [{'name': 'body', 'in': 'body', 'required': True, 'schema': items}],
+            'responses': {200: results, **_error_responses(400, 401, 403)},
+        },
+        'delete': {
+            'tags': tags, 'summary': f'Delete many {spec.label} items', 'security': _BEARER,
+            'parameters': [{'name': 'body', 'in': 'body', 'required': True, 'schema': {
+                'type': 'object', 'properties': {'ids': {'type': 'array', 'items': {'type': 'integer'}}}}}],
+            'responses': {200: results, **_error_responses(400, 401, 403)},
+        },
+    }
+
+
+def _handles(method, rule):
+    # A method serves a rule if it accepts every URL argument and needs no other
+    params = list(inspect.signature(method).parameters.values())[1:]  # Skip self
+    accepted = {param.name for param in params}
+    needed = {param.name for param in params if param.default is param.empty and param.kind is param.POSITIONAL_OR_KEYWORD}
+    return set(rule.arguments) <= accepted and needed <= set(rule.arguments)
+
+
+def _openapi_path(rule):
+    # /api/products/<int:item_id> -> /api/products/{item_id}
+    return re.sub(r'<(?:[^<>:]+:)?([^<>]+)>', r'{\1}', rule.rule)
+
+
+def build_spec(app):
+    """
+    Build the OpenAPI 2.0 document of every Flask-RESTful resource of ``app``.
+
+    Operations come from ``specs_dict`` (``swag_from``, ``crud_docs``);
+    methods without one are listed with their docstring as summary. Path
+    parameters are derived from the URL rules.
+
+    Returns:
+        dict: The document.
+    """
+    paths = {}
+    definitions = {}
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        view_class = getattr(app.view_functions.get(rule.endpoint), 'view_class', None)
+        if view_class is None or not rule.rule.startswith('/api/'):
+            continue
+        path_params = [
+            {'name': name, 'in': 'path', 'required': True,
+             'type': _PATH_PARAM_TYPES.get(type(rule._converters[name]).__name__, 'string')}
+            for name in sorted(rule.arguments)
+        ]
+        operations = {}
+        for verb in sorted(view_class.methods or ()):
+            method = getattr(view_class, verb.lower(), None)
+            if method is None or not _handles(method, rule):
+                continue
+            operation = json.loads(json.dumps(getattr(method, 'specs_dict', None) or {}))  # Deep copy
+            definitions.update(operation.pop('definitions', {}))
+            doc = inspect.getdoc(method)
+            if doc and 'summary' not in operation:
+                operation['summary'] = doc.splitlines()[0]
+            operation.setdefault('responses', {200: {'description': 'OK'}})
+            if path_params:
+                named = {param['name'] for param in operation.get('parameters', ())}
+                operation['parameters'] = [p for p in path_params if p['name'] not in named] + operation.get('parameters', [])
+            operations[verb.lower()] = operation
+        if operations:
+            paths[_openapi_path(rule)] = operations
+
+    return {
+        'swagger': '2.0',
+        'info': {'title': app.config['API_TITLE'], 'version': app.config['API_VERSION']},
+        'consumes': ['application/json'],
+        'produces': ['application/json'],
+        'securityDefinitions': {
+            'Bearer': {'type': 'apiKey', 'name': 'Authorization', 'in': 'header',
+                       'description': 'JWT from /api/login, as "Bearer <token>"'},
+        },
+        'paths': paths,
+        'definitions': definitions,
+    }
+
+
+def dump_spec(spec):
+    """Serialize a document deterministically, so equal specs have equal ETags."""
+    return json.dumps(spec, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def write_spec(spec, path):
+    """
+    Write the document and its precompressed variants (``.gz``, and ``.br`` if Brotli is installed).
+
+    Returns:
+        list: The files written.
+    """
+    body = dump_spec(spec)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    written = [path, path + '.gz']
+    with open(path, 'wb') as out:
+        out.write(body)
+    with open(path + '.gz', 'wb') as out:
+        out.write(gzip.compress(body, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        with open(path + '.br', 'wb') as out:
+            out.write(brotli.compress(body, quality=11))
+        written.append(path + '.br')
+    return written
+
+
+class _StaticSpec:
+    # The prebuilt files, read once per process and reread if the build changes them
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = None
+
+    def get(self, path):
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            if self._loaded is None or self._loaded[0] != (path, mtime):
+                variants = {}
+                for encoding, suffix in (('br', '.br'), ('gzip', '.gz'), (None, '')):
+                    if os.path.exists(path + suffix):
+                        with open(path + suffix, 'rb') as f:
+                            variants[encoding] = f.read()
+                etag = hashlib.sha1(variants[None]).hexdigest()
+                self._loaded = ((path, mtime), etag, variants)
+            return self._loaded[1], self._loaded[2]
+
+
+_static_spec = _StaticSpec()
+
+
+@apidocs_bp.route('/apispec_1.json')
+def static_spec():
+    """Serve the prebuilt OpenAPI document, precompressed and ETagged."""
+    path = current_app.config['API_SPEC_FILE']
+    if not os.path.exists(path):
+        return {'error': "API spec not built, run 'flask apidocs build'"}, 404
+    etag, variants = _static_spec.get(path)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        encoding = next(
+            (enc for enc in ('br', 'gzip') if enc in variants and enc in request.accept_encodings), None
+        )
+        response = Response(variants[encoding], mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"public, max-age={current_app.config['API_SPEC_MAX_AGE']}"
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_docs(app):
+    """
+    Set up API documentation according to ``API_DOCS_MODE``.
+
+    ``dynamic`` mounts the Flasgger UI at ``/apidocs/``, fed with the spec
+    built once at start-up (Flasgger does not walk the rules itself);
+    ``static`` serves only the prebuilt file and never imports Flasgger;
+    ``off`` serves nothing.
+    """
+    mode = app.config['API_DOCS_MODE']
+    if mode == 'static':
+        app.register_blueprint(apidocs_bp)
+    elif mode == 'dynamic':
+        from flasgger import Swagger
+
+        config = dict(Swagger.DEFAULT_CONFIG, specs=[{
+            'endpoint': 'apispec_1', 'route': '/apispec_1.json',
+            'rule_filter': lambda rule: False, 'model_filter': lambda tag: False,
+        }])
+        Swagger(app, template=build_spec(app), config=config)  # Initialize Flasgger for API documentation
+    elif mode != 'off':
+        raise ValueError(f'Unknown API_DOCS_MODE: {mode}')
+
+
+apidocs_cli = AppGroup('apidocs', help='Build the OpenAPI document.')
+
+
+@apidocs_cli.command('build')
+@click.option('--output', default=None, help='Target file, defaults to API_SPEC_FILE.')
+def build_command(output):
+    """Generate the OpenAPI document of every resource, with .gz/.br copies."""
+    from app import create_app
+
+    api_app = current_app._get_current_object()
+    if api_app.config['APP_ROLE'] not in ('api', 'all'):
+        # This process has no routes: build them from the same configuration
+        api_app = create_app(type('SpecConfig', (), dict(current_app.config)), role='api')
+    path = output or current_app.config['API_SPEC_FILE']
+    for written in write_spec(build_spec(api_app), path):
+        click.echo(f'Wrote {written} ({os.path.getsize(written)} bytes)')
@@ -1,62 +1,145 @@
+import os
+
 from flask import Flask
-from flask_restful import Api
-from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
-from flask_cors import CORS
 from models import db
-from flasgger import Swagger
-from resources import (
-    Register, Login, UserResource,  # Import new resources
-    ProductResource, NurseryResource, AboutUsResource,
-    MillingProcessResource, AggressionProcessResource, FarmProgressionResource,
-    HowToResource, AnnouncementResource
-)
 from config import Config
+from database import configure_engines, engine_options
+from response_cache import response_cache
+import versioning  # noqa: F401  Registers the row/table version session hooks
+import changelog  # noqa: F401  Registers the change log session hooks
+import images  # noqa: F401  Registers the image variant pipeline hooks and job
+
+# What each kind of process loads:
+#   api     HTTP workers: routes, JWT, CORS, media and API docs (Flasgger only in 'dynamic' docs mode)
+#   cli     `flask db ...` and the maintenance commands (Alembic is only imported here)
+#   worker  `flask jobs worker`: database and registered jobs only
+#   all     everything, for development
+ROLES = ('api', 'cli', 'worker', 'all')
+
+
+def create_app(config=Config, role=None):
+    """
+    Build the Flask application for one kind of process.
+
+    Heavy optional pieces are imported by the roles that use them: Alembic
+    (Flask-Migrate) for ``cli``, the resources (and Flasgger, with
+    ``API_DOCS_MODE='dynamic'``) for ``api``. Pillow is only imported when an
+    image is processed.
+
+    Args:
+        config (object): Configuration object, defaults to ``Config``.
+        role (str): One of ``ROLES``, defaults to ``$APP_ROLE`` or ``all``.
+
+    Returns:
+        Flask: The configured application.
+    """
+    role = role or os.getenv('APP_ROLE', 'all')
+    if role not in ROLES:
+        raise ValueError(f"Unknown app role {role!r}, expected one of {', '.join(ROLES)}")
+
+    app = Flask(__name__)
+    app.config.from_object(config)  # Load configuration from config.py
+    app.config['APP_ROLE'] = role
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)  # Pool options only where the final URI takes them
+    db.init_app(app)  # Initialize the database
+    configure_engines(app)  # WAL, busy_timeout and cache PRAGMAs on every SQLite connection
+    response_cache.init_app(app)  # Initialize the public GET response cache (writers invalidate it)
+
+    if role in ('api', 'all'):
+        _init_api(app)
+    if role in ('cli', 'all'):
+        _init_cli(app)
+    if role in ('worker', 'cli', 'all'):
+        from jobs import jobs_cli
+        app.cli.add_command(jobs_cli)  # `flask jobs worker`
+    return app
+
+
+def _init_api(app):
+    from flask_restful import Api
+    from flask_jwt_extended import JWTManager
+    from flask_cors import CORS
+    from apidocs import init_docs
+    from compression import init_compression
+    from metrics import init_metrics
+    from query_audit import init_query_audit
+    from media import media_bp
+    from search import SearchResource
+    from resources import (
+        Register, Login, UserResource,  # Import new resources
+        ProductResource, NurseryResource, AboutUsResource,
+        MillingProcessResource, AggressionProcessResource, FarmProgressionResource,
+        HowToResource, AnnouncementResource, SiteBundleResource, ChangesResource, CacheStatsResource,
+        ProductBulkResource, NurseryBulkResource, MillingProcessBulkResource,
+        AggressionProcessBulkResource, FarmProgressionBulkResource, HowToBulkResource,
+        AnnouncementBulkResource
+    )
+
+    # Enable CORS for localhost:3000 only
+    CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}}, expose_headers=["X-Next-Cursor", "Link"])
+
+    # Initialize extensions
+    api = Api(app)
+    JWTManager(app)  # Initialize JWT manager for handling authentication
+    app.register_blueprint(media_bp, url_prefix=app.config['MEDIA_URL'].rstrip('/'))  # Uploaded files under /media/<path>
+    init_metrics(app)  # /api/metrics; registered before compression so sizes are measured as sent
+    init_compression(app)  # gzip/Brotli responses per Accept-Encoding
+    init_query_audit(app)  # Query budgets and N+1 detection per QUERY_AUDIT_MODE
+
+    # === Core Resources ===
+    api.add_resource(Register, '/api/register')  # Register the only admin user
+    api.add_resource(Login, '/api/login')  # Login for the user and get JWT
+    api.add_resource(UserResource, '/api/user/<int:user_id>')  # User details
+
+    # === CRUD Resources ===
+    api.add_resource(ProductResource, '/api/products', '/api/products/<int:item_id>')  # CRUD for Products
+    api.add_resource(NurseryResource, '/api/nurseries', '/api/nurseries/<int:item_id>')  # CRUD for Nurseries
+    api.add_resource(AboutUsResource, '/api/about-us')  # View, Admin-only Create/Update/Delete About Us
+    api.add_resource(MillingProcessResource, '/api/milling-process', '/api/milling-process/<int:item_id>')  # CRUD for Milling Process
+    api.add_resource(AggressionProcessResource, '/api/aggression-process', '/api/aggression-process/<int:item_id>')  # CRUD for Aggression Process
+    api.add_resource(FarmProgressionResource, '/api/farm-progression', '/api/farm-progression/<int:item_id>')  # CRUD for Farm Progression
+    api.add_resource(HowToResource, '/api/how-to', '/api/how-to/<int:item_id>')  # CRUD for How-To Guides
+    api.add_resource(AnnouncementResource, '/api/announcements', '/api/announcements/<int:item_id>')  # CRUD for Announcements (Admin Only)
+
+    api.add_resource(SiteBundleResource, '/api/site-bundle')  # About Us and the first rows of every list in one response
+    api.add_resource(ChangesResource, '/api/changes')  # Inserts, updates and deletes since a cursor, for delta sync
+
+    # === Search ===
+    api.add_resource(SearchResource, '/api/search')  # Full-text search over products, nurseries, guides and announcements
+
+    # === Bulk Resources (Admin Only) ===
+    api.add_resource(ProductBulkResource, '/api/products/bulk')  # Batch create/update/delete Products
+    api.add_resource(NurseryBulkResource, '/api/nurseries/bulk')  # Batch create/update/delete Nurseries
+    api.add_resource(MillingProcessBulkResource, '/api/milling-process/bulk')  # Batch create/update/delete Milling Processes
+    api.add_resource(AggressionProcessBulkResource, '/api/aggression-process/bulk')  # Batch create/update/delete Aggression Processes
+    api.add_resource(FarmProgressionBulkResource, '/api/farm-progression/bulk')  # Batch create/update/delete Farm Progressions
+    api.add_resource(HowToBulkResource, '/api/how-to/bulk')  # Batch create/update/delete How-To Guides
+    api.add_resource(AnnouncementBulkResource, '/api/announcements/bulk')  # Batch create/update/delete Announcements
+
+    # === Operations ===
+    api.add_resource(CacheStatsResource, '/api/cache/stats')  # Response cache hit/miss counters (Admin Only)
+
+    init_docs(app)  # API docs per API_DOCS_MODE, built from the routes registered above
+
+
+def _init_cli(app):
+    from flask_migrate import Migrate
+    from flask_migrate.cli import db as db_cli
+    from apidocs import apidocs_cli
+    from changelog import changes_cli
+    from query_plans import audit_budgets_command, audit_plans_command
+    from search import include_object, search_cli
+    from storage import media_cli
+
+    Migrate(app, db, include_object=include_object)  # Initialize Flask-Migrate for DB migrations
+    db_cli.add_command(audit_plans_command)  # `flask db audit-plans`
+    db_cli.add_command(audit_budgets_command)  # `flask db audit-budgets`
+    app.cli.add_command(search_cli)  # `flask search rebuild`
+    app.cli.add_command(media_cli)  # `flask media gc`
+    app.cli.add_command(apidocs_cli)  # `flask apidocs build`
+    app.cli.add_command(changes_cli)  # `flask changes prune`
 
-# Initialize the Flask application
-app = Flask(__name__)
-app.config.from_object(Config)  # Load configuration from config.py
-
-# Enable CORS for localhost:3000 only
-CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
-
-# Initialize extensions
-api = Api(app)
-db.init_app(app)  # Initialize the database
-jwt = JWTManager(app)  # Initialize JWT manager for handling authentication
-migrate = Migrate(app, db)  # Initialize Flask-Migrate for DB migrations
-swagger = Swagger(app)  # Initialize Flasgger for API documentation
-
-# === Core Resources ===
-api.add_resource(Register, '/api/register')  # Register the only admin user
-api.add_resource(Login, '/api/login')  # Login for the user and get JWT
-api.add_resource(UserResource, '/api/user/<int:user_id>')  # User details
-
-# === CRUD Resources ===
-api.add_resource(ProductResource, '/api/products', '/api/products/<int:product_id>')  # CRUD for Products
-api.add_resource(NurseryResource, '/api/nurseries', '/api/nurseries/<int:nursery_id>')  # CRUD for Nurseries
-api.add_resource(AboutUsResource, '/api/about-us')  # View, Admin-only Create/Update/Delete About Us
-api.add_resource(MillingProcessResource, '/api/milling-process', '/api/milling-process/<int:process_id>')  # CRUD for Milling Process
-api.add_resource(AggressionProcessResource, '/api/aggression-process', '/api/aggression-process/<int:process_id>')  # CRUD for Aggression Process
-api.add_resource(FarmProgressionResource, '/api/farm-progression')  # CRUD for Farm Progression
-api.add_resource(HowToResource, '/api/how-to', '/api/how-to/<int:guide_id>')  # CRUD for How-To Guides
-api.add_resource(AnnouncementResource, '/api/announcements', '/api/announcements/<int:announcement_id>')  # CRUD for Announcements (Admin Only)
 
 if __name__ == '__main__':
-    app.run(debug=True)  # Run the app in debug mode
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    create_app().run(debug=True)  # Run the app in debug mode
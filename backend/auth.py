@@ -0,0 +1,87 @@
+from functools import wraps
+
+from flask import current_app
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from sqlalchemy import event, select
+
+from models import db, User
+from response_cache import LRUCache
+
+# Short-lived view of each user's admin flag, so revoked or demoted admins
+# lose access within AUTH_USER_STATUS_TTL seconds without a query per request
+_user_status = None
+
+
+def _status_cache():
+    global _user_status
+    if _user_status is None:
+        _user_status = LRUCache(
+            maxsize=current_app.config['AUTH_USER_STATUS_CACHE_SIZE'],
+            ttl=current_app.config['AUTH_USER_STATUS_TTL']
+        )
+    return _user_status
+
+
+def admin_claims(user):
+    """
+    Claims embedded in the access token at login.
+
+    Args:
+        user (User): The authenticated user.
+
+    Returns:
+        dict: Additional claims for ``create_access_token``.
+    """
+    return {'is_admin': bool(user.is_admin)}
+
+
+def user_is_admin(user_id):
+    """
+    Check that a user still exists and is an admin.
+
+    The answer is cached per user for ``AUTH_USER_STATUS_TTL`` seconds.
+
+    Args:
+        user_id (str): Identity stored in the token.
+
+    Returns:
+        bool: True if the user is currently an admin.
+    """
+    cache = _status_cache()
+    key = str(user_id)
+    status = cache.get(key)
+    if status is None:
+        status = bool(db.session.execute(
+            select(User.is_admin).where(User.id == int(user_id))
+        ).scalar())
+        cache.set(key, status)
+    return status
+
+
+def forget_user(user_id):
+    """Drop the cached admin status of a user."""
+    if _user_status is not None:
+        _user_status.delete(str(user_id))
+
+
+def admin_required(fn):
+    """
+    Decorator restricting a resource method to admins.
+
+    Verifies the access token and reads the ``is_admin`` claim added at
+    login; the user's current status comes from the short-TTL cache.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        claims = get_jwt()
+        if not claims.get('is_admin') or not user_is_admin(claims['sub']):
+            return {'message': 'You do not have permission to perform this action'}, 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_changed_user(mapper, connection, target):
+    forget_user(target.id)
@@ -0,0 +1,341 @@
+"""
+HTTP load benchmark of every API endpoint against a locally started server.
+
+A seeded database (see seed.py) is served by a fresh API process, and each
+scenario is driven by concurrent keep-alive clients for a fixed duration.
+Queries per request come from the server's own /api/metrics counters and
+memory from /proc, so nothing is added to the request path.
+
+Usage (from backend/):
+    python benchmarks/seed.py --scale 100k
+    python benchmarks/load.py --scale 100k [--concurrency 8] [--duration 10]
+        [--scenarios products.list,site-bundle] [--output results.json] [--compare old.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import seed
+
+BACKEND_DIR = seed.BACKEND_DIR
+
+_SERVER = """
+import sys
+from werkzeug.serving import run_simple
+from app import create_app
+run_simple(sys.argv[1], int(sys.argv[2]), create_app(role='api'), threaded=True)
+"""
+
+# CRUD resources: (name, URL prefix)
+CRUD_ROUTES = (
+    ('products', '/api/products'),
+    ('nurseries', '/api/nurseries'),
+    ('milling-process', '/api/milling-process'),
+    ('aggression-process', '/api/aggression-process'),
+    ('farm-progression', '/api/farm-progression'),
+    ('how-to', '/api/how-to'),
+    ('announcements', '/api/announcements'),
+)
+
+
+class Scenario:
+    """
+    One endpoint under load.
+
+    Args:
+        name (str): Scenario name used in reports and ``--scenarios``.
+        method (str): HTTP method.
+        path (callable): ``(rng, rows) -> path`` so each request can vary.
+        body (callable): ``(rng, rows) -> JSON-serialisable body`` or ``None``.
+        admin (bool): Send the admin token.
+    """
+
+    def __init__(self, name, method, path, body=None, admin=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.admin = admin
+
+
+def scenarios():
+    """Every benchmarked endpoint, reads first and writes last."""
+    reads = []
+    writes = []
+    for name, prefix in CRUD_ROUTES:
+        reads += [
+            Scenario(f'{name}.list', 'GET', lambda rng, rows, p=prefix: f'{p}?limit=50&after={rng.randrange(rows)}'),
+            Scenario(f'{name}.item', 'GET', lambda rng, rows, p=prefix: f'{p}/{rng.randint(1, rows)}'),
+        ]
+    reads += [
+        Scenario('products.fields', 'GET', lambda rng, rows: f'/api/products?fields=name&limit=200&after={rng.randrange(rows)}'),
+        Scenario('about-us', 'GET', lambda rng, rows: '/api/about-us'),
+        Scenario('site-bundle', 'GET', lambda rng, rows: '/api/site-bundle'),
+        Scenario('changes', 'GET', lambda rng, rows: '/api/changes?since=0&limit=200'),
+        Scenario('search', 'GET', lambda rng, rows: f'/api/search?q={rng.choice(seed.WORDS)}'),
+        Scenario('metrics', 'GET', lambda rng, rows: '/api/metrics'),
+        Scenario('user', 'GET', lambda rng, rows: '/api/user/1', admin=True),
+        Scenario('cache-stats', 'GET', lambda rng, rows: '/api/cache/stats', admin=True),
+    ]
+    writes += [
+        Scenario('login', 'POST', lambda rng, rows: '/api/login',
+                 lambda rng, rows: {'email': seed.ADMIN_EMAIL, 'password': seed.ADMIN_PASSWORD}),
+        Scenario('how-to.update', 'PUT', lambda rng, rows: f'/api/how-to/{rng.randint(1, rows)}',
+                 lambda rng, rows: {'title': ' '.join(rng.choices(seed.WORDS, k=4))}, admin=True),
+        Scenario('announcements.create', 'POST', lambda rng, rows: '/api/announcements',
+                 lambda rng, rows: {'title': 'Benchmark', 'description': ' '.join(rng.choices(seed.WORDS, k=30))},
+                 admin=True),
+        Scenario('products.bulk-update', 'PUT', lambda rng, rows: '/api/products/bulk',
+                 lambda rng, rows: [{'id': rng.randint(1, rows), 'description': ' '.join(rng.choices(seed.WORDS, k=20))}
+                                    for _ in range(10)], admin=True),
+    ]
+    return reads + writes
+
+
+class Server:
+    """The API in its own process, on a free local port."""
+
+    def __init__(self, database, host='127.0.0.1', port=5055):
+        self.host = host
+        self.port = port
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', APP_ROLE='api',
+                   METRICS_MODE='process', QUERY_AUDIT_MODE='off', METRICS_TOKEN='')
+        self.process = subprocess.Popen(
+            [sys.executable, '-c', _SERVER, host, str(port)], cwd=BACKEND_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    def wait(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError('The API server exited during start-up')
+            try:
+                request(self.host, self.port, 'GET', '/api/metrics')
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError('The API server did not start in time')
+
+    def memory(self):
+        """Current and peak resident set size in MiB, from /proc (Linux only)."""
+        try:
+            with open(f'/proc/{self.process.pid}/status') as f:
+                status = dict(line.split(':', 1) for line in f if ':' in line)
+        except OSError:
+            return None, None
+        return (int(status['VmRSS'].split()[0]) / 1024, int(status['VmHWM'].split()[0]) / 1024)
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def request(host, port, method, path, body=None, headers=None, connection=None):
+    """Send one request, returning ``(status, body)``."""
+    conn = connection or http.client.HTTPConnection(host, port, timeout=30)
+    payload = json.dumps(body).encode('utf-8') if body is not None else None
+    headers = dict(headers or {})
+    if payload is not None:
+        headers['Content-Type'] = 'application/json'
+    conn.request(method, path, body=payload, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    if connection is None:
+        conn.close()
+    return response.status, data
+
+
+_SAMPLE = re.compile(r'^(\w+)\{route="((?:[^"\\]|\\.)*)"[^}]*\}\s+(\S+)$')
+
+
+def route_totals(host, port):
+    """``{route: (requests, queries)}`` summed from the server's /api/metrics."""
+    _, body = request(host, port, 'GET', '/api/metrics')
+    totals = {}
+    for line in body.decode('utf-8').splitlines():
+        match = _SAMPLE.match(line)
+        if match and match.group(1) in ('http_requests_total', 'db_queries_total'):
+            requests_, queries = totals.get(match.group(2), (0, 0))
+            value = float(match.group(3))
+            if match.group(1) == 'http_requests_total':
+                totals[match.group(2)] = (requests_ + value, queries)
+            else:
+                totals[match.group(2)] = (requests_, queries + value)
+    return totals
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(server, scenario, rows, token, concurrency, duration, warmup, seed_value):
+    """
+    Drive one scenario with ``concurrency`` clients.
+
+    Returns:
+        dict: Throughput, latency percentiles (ms), status counts, queries per request and memory.
+    """
+    headers = {'Accept-Encoding': 'gzip'}
+    if scenario.admin:
+        headers['Authorization'] = f'Bearer {token}'
+    latencies = [[] for _ in range(concurrency)]
+    statuses = [{} for _ in range(concurrency)]
+    start_at = time.monotonic() + warmup
+    stop_at = start_at + duration
+
+    def client(index):
+        rng = random.Random(seed_value + index)
+        conn = http.client.HTTPConnection(server.host, server.port, timeout=30)
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            body = scenario.body(rng, rows) if scenario.body else None
+            started = time.perf_counter()
+            try:
+                status, _ = request(server.host, server.port, scenario.method, scenario.path(rng, rows),
+                                    body, headers, connection=conn)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(server.host, server.port, timeout=30)
+                status = 'error'
+            elapsed = time.perf_counter() - started
+            if now >= start_at:  # Requests sent during warm-up are not recorded
+                latencies[index].append(elapsed)
+                statuses[index][status] = statuses[index].get(status, 0) + 1
+        conn.close()
+
+    before = route_totals(server.host, server.port)
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    after = route_totals(server.host, server.port)
+
+    # Per-request queries of the scenario's route, including warm-up requests
+    served = {route: (count - before.get(route, (0, 0))[0], queries - before.get(route, (0, 0))[1])
+              for route, (count, queries) in after.items() if route != '/api/metrics'}
+    served_requests = sum(count for count, _ in served.values())
+    served_queries = sum(queries for _, queries in served.values())
+
+    samples = sorted(value for values in latencies for value in values)
+    merged_statuses = {}
+    for counts in statuses:
+        for status, count in counts.items():
+            merged_statuses[str(status)] = merged_statuses.get(str(status), 0) + count
+    rss, peak_rss = server.memory()
+    return {
+        'scenario': scenario.name,
+        'method': scenario.method,
+        'requests': len(samples),
+        'rps': round(len(samples) / duration, 1),
+        'p50_ms': round(_percentile(samples, 0.50) * 1000, 2) if samples else None,
+        'p95_ms': round(_percentile(samples, 0.95) * 1000, 2) if samples else None,
+        'p99_ms': round(_percentile(samples, 0.99) * 1000, 2) if samples else None,
+        'mean_ms': round(statistics.fmean(samples) * 1000, 2) if samples else None,
+        'statuses': merged_statuses,
+        'queries_per_request': round(served_queries / served_requests, 2) if served_requests else None,
+        'rss_mb': round(rss, 1) if rss is not None else None,
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, results):
+    """Print the RPS and p95 change of each scenario against an earlier report."""
+    old = {r['scenario']: r for r in previous['results']}
+    print(f"\n{'scenario':28} {'rps':>10} {'Δ rps':>8} {'p95 ms':>10} {'Δ p95':>8}")
+    for r in results:
+        before = old.get(r['scenario'])
+        if not before or not before['rps'] or not before['p95_ms'] or r['p95_ms'] is None:
+            continue
+        rps_change = (r['rps'] - before['rps']) / before['rps'] * 100
+        p95_change = (r['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+        print(f"{r['scenario']:28} {r['rps']:>10} {rps_change:>+7.1f}% {r['p95_ms']:>10} {p95_change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(seed.SCALES), default='1k')
+    parser.add_argument('--database', help='Seeded SQLite file, defaults to instance/bench-<scale>.db.')
+    parser.add_argument('--rows', type=int, help='Rows per content model of --database, defaults to the scale.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per scenario.')
+    parser.add_argument('--warmup', type=float, default=1.0, help='Seconds per scenario before recording.')
+    parser.add_argument('--scenarios', help='Comma separated scenario names, defaults to all.')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON report file, defaults to benchmarks/results/<commit>-<scale>.json.')
+    parser.add_argument('--compare', help='Earlier JSON report to compare against.')
+    args = parser.parse_args()
+
+    database = os.path.abspath(args.database or seed.default_database(args.scale))
+    if not os.path.exists(database):
+        sys.exit(f'{database} not found, run: python benchmarks/seed.py --scale {args.scale}')
+    rows = args.rows or seed.SCALES[args.scale]
+    selected = scenarios()
+    if args.scenarios:
+        names = set(args.scenarios.split(','))
+        selected = [scenario for scenario in selected if scenario.name in names]
+
+    server = Server(database, port=args.port)
+    try:
+        server.wait()
+        _, body = request(server.host, server.port, 'POST', '/api/login',
+                          {'email': seed.ADMIN_EMAIL, 'password': seed.ADMIN_PASSWORD})
+        token = json.loads(body)['access_token']
+
+        print(f"{'scenario':28} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6} {'rss MB':>7}  statuses")
+        results = []
+        for scenario in selected:
+            r = run_scenario(server, scenario, rows, token, args.concurrency, args.duration, args.warmup, args.seed)
+            results.append(r)
+            print(f"{r['scenario']:28} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+                  f"{r['queries_per_request']!s:>6} {r['rss_mb']!s:>7}  {r['statuses']}")
+    finally:
+        server.stop()
+
+    commit = _git_commit()
+    report = {
+        'commit': commit,
+        'scale': args.scale,
+        'rows_per_model': rows,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'python': sys.version.split()[0],
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results,
+    }
+    output = args.output or os.path.join(BACKEND_DIR, 'benchmarks', 'results', f"{(commit or 'local')[:12]}-{args.scale}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as out:
+        json.dump(report, out, indent=2)
+    print(f'\nWrote {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
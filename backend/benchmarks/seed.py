@@ -0,0 +1,152 @@
+"""
+Seed a SQLite database with generated content for the HTTP benchmarks.
+
+Every content model gets the same number of rows of deterministic text
+(seeded RNG), so two runs at one scale produce identical databases. Rows
+are written with raw ``executemany`` batches in one transaction, and the
+full-text indexes are built once at the end instead of by triggers.
+
+Usage (from backend/):
+    python benchmarks/seed.py --scale 100k [--database /tmp/bench-100k.db] [--force]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+ADMIN_EMAIL = 'bench@example.com'
+ADMIN_PASSWORD = 'bench-password'
+
+BATCH_SIZE = 20_000
+
+# Vocabulary of the generated text; search benchmarks query these words
+WORDS = (
+    'coffee', 'macadamia', 'avocado', 'seedling', 'nursery', 'harvest', 'cherry', 'parchment',
+    'milling', 'drying', 'grading', 'roasting', 'arabica', 'ruiru', 'batian', 'mulch', 'compost',
+    'pruning', 'irrigation', 'terrace', 'shade', 'rainfall', 'altitude', 'cooperative', 'farmer',
+    'training', 'yield', 'quality', 'export', 'market', 'price', 'fertilizer', 'pest', 'disease',
+    'leaf', 'rust', 'berry', 'borer', 'grafting', 'rootstock', 'soil', 'acidity', 'season',
+    'planting', 'spacing', 'weeding', 'record', 'storage', 'transport', 'factory', 'washing',
+    'fermentation', 'sorting', 'bags', 'weight', 'moisture', 'sun', 'beds', 'tables', 'county',
+)
+
+
+def default_database(scale):
+    return os.path.join(BACKEND_DIR, 'instance', f'bench-{scale}.db')
+
+
+def _text(rng, max_length, words):
+    return ' '.join(rng.choices(WORDS, k=words))[:max_length]
+
+
+def _column_values(table):
+    # (column name, generator) for each column the benchmark fills in
+    values = []
+    for column in table.c:
+        name = column.name
+        if name in ('id', 'version', 'updated_at') or name.endswith(('_variants', '_path')):
+            continue
+        length = getattr(column.type, 'length', None)
+        if name == 'video_link':
+            values.append((name, lambda rng, i: f'https://videos.example.com/watch/{i}'))
+        elif length:
+            values.append((name, lambda rng, i, length=length: _text(rng, length, 4 if length <= 100 else 30)))
+        else:
+            values.append((name, lambda rng, i: _text(rng, 10_000, 120)))
+    return values
+
+
+def _rows(table, count, rng, now):
+    values = _column_values(table)
+    for i in range(1, count + 1):
+        yield [generate(rng, i) for _, generate in values] + [1, now]
+
+
+def seed(path, rows, seed_value=42, echo=print):
+    """
+    Create the schema at ``path`` and fill every content table with ``rows`` rows.
+
+    Args:
+        path (str): SQLite file to create.
+        rows (int): Rows per content model.
+        seed_value (int): RNG seed, so equal arguments give equal data.
+        echo (callable): Progress output.
+    """
+    from app import create_app
+    from config import Config
+    from models import db, AboutUs, User
+    from search import rebuild_search_index
+    import crud
+    import resources  # noqa: F401  Registers the CRUD models in crud.registry
+
+    config = type('SeedConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SQLALCHEMY_BINDS': {}})
+    app = create_app(config, role='worker')
+    rng = random.Random(seed_value)
+    now = datetime.utcnow().isoformat(sep=' ')
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(AboutUs(**{
+            column: _text(rng, 10_000, 200) for column in resources.ABOUT_US_FIELDS if column != 'id'
+        }))
+        admin = User(username='bench', email=ADMIN_EMAIL, is_admin=True)
+        admin.set_password(ADMIN_PASSWORD)
+        db.session.add(admin)
+        db.session.commit()
+        db.engine.dispose()
+
+        connection = sqlite3.connect(path)
+        connection.execute('PRAGMA synchronous = OFF')
+        for table_name, spec in sorted(crud.registry.items()):
+            started = time.perf_counter()
+            table = spec.model.__table__
+            columns = [name for name, _ in _column_values(table)] + ['version', 'updated_at']
+            sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            generated = _rows(table, rows, rng, now)
+            with connection:
+                while True:
+                    batch = [row for _, row in zip(range(BATCH_SIZE), generated)]
+                    if not batch:
+                        break
+                    connection.executemany(sql, batch)
+            echo(f'{table_name}: {rows} rows in {time.perf_counter() - started:.1f}s')
+        connection.close()
+
+        started = time.perf_counter()
+        with db.engine.begin() as conn:
+            rebuild_search_index(conn)
+        echo(f'search index built in {time.perf_counter() - started:.1f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--rows', type=int, help='Rows per content model, overrides --scale.')
+    parser.add_argument('--database', help='SQLite file, defaults to instance/bench-<scale>.db.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help='Replace an existing database.')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.database or default_database(args.scale))
+    if os.path.exists(path):
+        if not args.force:
+            print(f'{path} exists, use --force to recreate it')
+            return
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    seed(path, args.rows or SCALES[args.scale], args.seed)
+    print(f'Seeded {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Cold start benchmark for the application factory.
+
+Every sample runs in a fresh interpreter, so module import cost is
+measured the way a new or recycled worker pays it.
+
+Usage (from backend/):
+    python benchmarks/startup.py [--runs 5] [--roles api,cli,worker,all] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose presence after start-up shows a role loaded something it does not need
+HEAVY_MODULES = ('PIL', 'alembic', 'flask_migrate', 'flasgger', 'jsonschema', 'redis')
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app(role=sys.argv[1])
+ready = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'init_ms': (ready - imported) * 1000,
+    'modules': len(sys.modules),
+    'heavy': sorted(name for name in %r if name in sys.modules),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def sample(role):
+    """Start one interpreter, build the app for ``role`` and return its timings."""
+    output = subprocess.run(
+        [sys.executable, '-c', _PROBE, role], cwd=BACKEND_DIR,
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(role, runs):
+    """Median import and init time of ``runs`` cold starts."""
+    samples = [sample(role) for _ in range(runs)]
+    return {
+        'role': role,
+        'runs': runs,
+        'import_ms': round(statistics.median(s['import_ms'] for s in samples), 1),
+        'init_ms': round(statistics.median(s['init_ms'] for s in samples), 1),
+        'total_ms': round(statistics.median(s['import_ms'] + s['init_ms'] for s in samples), 1),
+        'modules': samples[-1]['modules'],
+        'heavy_modules': samples[-1]['heavy'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--roles', default='api,cli,worker,all')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable results.')
+    args = parser.parse_args()
+
+    results = [measure(role, args.runs) for role in args.roles.split(',')]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'role':8} {'import ms':>10} {'init ms':>10} {'total ms':>10} {'modules':>8}  heavy modules")
+    for r in results:
+        print(f"{r['role']:8} {r['import_ms']:>10} {r['init_ms']:>10} {r['total_ms']:>10} {r['modules']:>8}  "
+              f"{', '.join(r['heavy_modules']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
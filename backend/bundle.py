@@ -0,0 +1,106 @@
+from flask import Response, current_app, request
+
+from fragments import json_response, keyed_select, row_fragments, version_keys
+from http_cache import is_not_modified, make_etag, validator_headers
+from models import db
+from versioning import get_table_versions
+
+
+class BundleError(ValueError):
+    """Raised when ``?sections=`` or ``?limit=`` is invalid."""
+
+
+class Section:
+    """
+    One part of a bundle: the first rows of a list, or a single row.
+
+    Args:
+        model (db.Model): A ``VersionedMixin`` model.
+        fields (tuple): Fields serialized for each row.
+        many (bool): List of rows (``True``) or the first row only.
+    """
+
+    def __init__(self, model, fields, many=True):
+        self.model = model
+        self.fields = fields
+        self.many = many
+
+    def render(self, limit):
+        """Encoded JSON of the section, built from the cached row fragments."""
+        if not self.many:
+            row = db.session.execute(keyed_select(self.model, self.fields).limit(1)).first()
+            return row_fragments.item(self.model, self.fields, row) if row else b'null'
+        id_column = self.model.__table__.c.id
+        keys = db.session.execute(version_keys(self.model).order_by(id_column).limit(limit)).all()
+        return b'[' + b','.join(row_fragments.rows(self.model, self.fields, keys)) + b']'
+
+
+def _parse_limit(raw, name):
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise BundleError(f"Limit of '{name}' must be an integer")
+    if limit < 1:
+        raise BundleError(f"Limit of '{name}' must be at least 1")
+    return min(limit, current_app.config['PAGE_MAX_LIMIT'])
+
+
+def requested_sections(available):
+    """
+    Resolve ``?sections=`` and ``?limit=`` against the declared sections.
+
+    ``?sections=products:5,about_us`` selects sections, each with an
+    optional row limit; ``?limit=`` is the limit of the others. Without
+    ``?sections=`` every section is included.
+
+    Args:
+        available (dict): Section name to ``Section``.
+
+    Returns:
+        list: ``(name, limit)`` pairs in declaration order.
+    """
+    raw_limit = request.args.get('limit')
+    default = _parse_limit(raw_limit, 'limit') if raw_limit else current_app.config['SITE_BUNDLE_LIMIT']
+
+    raw = request.args.get('sections')
+    if not raw:
+        return [(name, default) for name in available]
+    wanted = {}
+    for part in raw.split(','):
+        name, _, limit = part.strip().partition(':')
+        if name:
+            wanted[name] = _parse_limit(limit, name) if limit else default
+    unknown = sorted(set(wanted).difference(available))
+    if unknown:
+        raise BundleError(f"Unknown section(s): {', '.join(unknown)}")
+    return [(name, wanted[name]) for name in available if name in wanted]
+
+
+def bundle_response(available):
+    """
+    Render the requested sections as one JSON object.
+
+    The ETag combines the table version of every included section, so a
+    write to any of them changes it and an unchanged bundle is answered
+    with 304 after a single version query.
+
+    Args:
+        available (dict): Section name to ``Section``.
+
+    Returns:
+        Response or tuple: The bundle, 304, or a 400 error tuple.
+    """
+    try:
+        wanted = requested_sections(available)
+    except BundleError as e:
+        return {'error': str(e)}, 400
+
+    versions = get_table_versions({available[name].model for name, _ in wanted})
+    etag = make_etag('bundle', *(f'{table}={version}' for table, (version, _) in sorted(versions.items())))
+    last_modified = max((updated for _, updated in versions.values() if updated is not None), default=None)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(etag, last_modified):
+        return Response(status=304, headers=headers)
+
+    body = b','.join(b'"%s":%s' % (name.encode('utf-8'), available[name].render(limit)) for name, limit in wanted)
+    return json_response(b'{' + body + b'}', headers=headers)
@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from fragments import dumps, json_response, row_fragments
+from models import db, Change, VersionedMixin
+from pagination import PaginationError, parse_int
+
+_table = Change.__table__
+
+changes_cli = AppGroup('changes', help='Maintain the change log behind /api/changes.')
+
+
+def record_changes(connection, model, op, ids, now=None):
+    """
+    Append one change per row to the change log.
+
+    Core statements (bulk writes, raw SQL) bypass the ORM session hooks and
+    must call this themselves, on the same connection, after the write.
+    Inserted and updated rows are logged with the version and
+    ``updated_at`` they now have, read back in a single
+    ``INSERT ... SELECT``.
+
+    Args:
+        connection (Connection): Connection of the writing transaction.
+        model (db.Model): The ``VersionedMixin`` model written to.
+        op (str): ``'insert'``, ``'update'`` or ``'delete'``.
+        ids (iterable): Ids of the written rows.
+        now (datetime): Deletion time, defaults to the current UTC time.
+    """
+    ids = sorted(set(ids))
+    if not ids:
+        return
+    table_name = model.__tablename__
+    if op == 'delete':
+        now = now or datetime.utcnow()
+        connection.execute(insert(_table), [
+            {'table_name': table_name, 'row_id': row_id, 'op': op, 'version': None, 'changed_at': now}
+            for row_id in ids
+        ])
+        return
+    columns = model.__table__.c
+    rows = (
+        select(literal(table_name), columns.id, literal(op), columns.version, columns.updated_at)
+        .where(columns.id.in_(ids))
+        .order_by(columns.id)
+    )
+    connection.execute(insert(_table).from_select(['table_name', 'row_id', 'op', 'version', 'changed_at'], rows))
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_changes(session, flush_context, instances):
+    pending = session.info.setdefault('pending_changes', [])
+    pending.extend((obj, 'insert') for obj in session.new if isinstance(obj, VersionedMixin))
+    pending.extend(
+        (obj, 'update') for obj in session.dirty
+        if isinstance(obj, VersionedMixin) and session.is_modified(obj)
+    )
+    pending.extend((obj, 'delete') for obj in session.deleted if isinstance(obj, VersionedMixin))
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_changes(session, flush_context):
+    pending = session.info.pop('pending_changes', None)
+    if not pending:
+        return
+    # Ids of new rows exist now; versions and updated_at were set by versioning's before_flush
+    now = datetime.utcnow()
+    session.connection().execute(insert(_table), [
+        {
+            'table_name': obj.__tablename__,
+            'row_id': obj.id,
+            'op': op,
+            'version': None if op == 'delete' else obj.version,
+            'changed_at': now if op == 'delete' else obj.updated_at,
+        }
+        for obj, op in pending
+    ])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('pending_changes', None)
+
+
+def head_seq():
+    """The ``seq`` of the latest change, 0 if the log is empty."""
+    return db.session.execute(select(func.max(_table.c.seq))).scalar() or 0
+
+
+def _cursor_expired(since, entries):
+    # The log is pruned from the oldest end, so a cursor is only served while the
+    # change right after it is still there. Nothing after the cursor means the client
+    # is up to date, or ahead of a replica that has not caught up yet: an empty delta
+    if not entries:
+        return False
+    if entries[0].seq == since + 1:
+        return False
+    older = db.session.execute(select(_table.c.seq).where(_table.c.seq <= since).limit(1)).first()
+    return older is None
+
+
+def changes_response(feeds):
+    """
+    The content changes after ``?since=<seq>``, oldest first.
+
+    Reads at most ``?limit=`` log entries. Several changes to one row are
+    collapsed into its latest: an ``upsert`` carrying the row's current
+    fields (from the cached row fragments) or a ``delete`` tombstone. The
+    work depends on the number of changes, not on the size of the tables.
+
+    Without ``?since=`` only the current cursor is returned: clients take
+    it, fetch the full lists once, then sync from it. A cursor the log no
+    longer covers (see ``flask changes prune``) is answered with 410 and the
+    current cursor, after which the client does the same.
+
+    Args:
+        feeds (dict): Table name to the ``(model, fields)`` served for it.
+
+    Returns:
+        Response or tuple: The changes, or a 400/410 error tuple.
+    """
+    try:
+        since = parse_int('since', 0)
+        limit = parse_int('limit', 1)
+    except PaginationError as e:
+        return {'error': str(e)}, 400
+    if since is None:
+        return {'changes': [], 'next': head_seq(), 'has_more': False}, 200
+
+    limit = min(limit or current_app.config['CHANGES_DEFAULT_LIMIT'], current_app.config['PAGE_MAX_LIMIT'])
+    # Fetch one extra entry to learn whether another page exists
+    entries = db.session.execute(
+        select(_table.c.seq, _table.c.table_name, _table.c.row_id, _table.c.op, _table.c.version, _table.c.changed_at)
+        .where(_table.c.seq > since)
+        .order_by(_table.c.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if _cursor_expired(since, entries):
+        return {'error': 'The change log no longer covers this cursor, fetch the full lists again',
+                'next': head_seq()}, 410
+
+    latest = {}
+    for entry in entries:
+        key = (entry.table_name, entry.row_id)
+        latest.pop(key, None)  # Re-inserted so the row takes the position of its latest change
+        latest[key] = entry
+
+    fragments = {}
+    for table_name, (model, fields) in feeds.items():
+        keys = [
+            (entry.row_id, entry.version, entry.changed_at)
+            for entry in latest.values() if entry.table_name == table_name and entry.op != 'delete'
+        ]
+        if keys:
+            fragments[table_name] = row_fragments.by_id(model, fields, keys)
+
+    changes = []
+    for entry in latest.values():
+        if entry.table_name not in feeds:
+            continue
+        head = b'{"seq":%d,"table":%s,"id":%d' % (entry.seq, dumps(entry.table_name), entry.row_id)
+        if entry.op == 'delete':
+            changes.append(head + b',"op":"delete"}')
+        elif entry.row_id in fragments[entry.table_name]:  # Deleted since; its tombstone follows in the log
+            changes.append(head + b',"op":"upsert","data":' + fragments[entry.table_name][entry.row_id] + b'}')
+
+    next_seq = entries[-1].seq if entries else since
+    body = b'{"changes":[' + b','.join(changes) + b'],"next":%d,"has_more":%s}' % (next_seq, dumps(has_more))
+    return json_response(body)
+
+
+@changes_cli.command('prune')
+@click.option('--older-than', type=int, default=None, help='Age in days, defaults to CHANGES_RETENTION_DAYS.')
+def prune_command(older_than):
+    """Delete old change log entries; clients with older cursors resync in full."""
+    days = older_than if older_than is not None else current_app.config['CHANGES_RETENTION_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    # The latest entry is always kept, it holds the current cursor
+    result = db.session.execute(
+        delete(_table).where(_table.c.changed_at < cutoff, _table.c.seq < head_seq())
+    )
+    db.session.commit()
+    click.echo(f'Deleted {result.rowcount} change(s)')
@@ -0,0 +1,113 @@
+import gzip
+
+from flask import current_app, request
+
+# Content types worth compressing; images, video and archives already are
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'text/html', 'text/css',
+    'text/javascript', 'text/plain', 'image/svg+xml',
+)
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def available_encodings():
+    """``COMPRESS_ALGORITHMS`` minus Brotli when the ``brotli`` package is not installed."""
+    return [
+        encoding for encoding in current_app.config['COMPRESS_ALGORITHMS']
+        if encoding != 'br' or _brotli() is not None
+    ]
+
+
+def negotiate():
+    """
+    Pick the content coding for the current request.
+
+    The client's ``Accept-Encoding`` qualities win; on a tie the order of
+    ``COMPRESS_ALGORITHMS`` decides.
+
+    Returns:
+        str: ``'br'``, ``'gzip'`` or ``None`` for an uncompressed response.
+    """
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(body, encoding, cached=False):
+    """
+    Compress a response body.
+
+    Args:
+        body (bytes): Uncompressed payload.
+        encoding (str): ``'br'`` or ``'gzip'``.
+        cached (bool): The result is kept for every later request, so spend
+            ``COMPRESS_CACHED_LEVEL`` effort instead of ``COMPRESS_LEVEL``.
+
+    Returns:
+        bytes: The compressed payload.
+    """
+    config = current_app.config
+    if encoding == 'br':
+        quality = config['COMPRESS_CACHED_BR_QUALITY'] if cached else config['COMPRESS_BR_QUALITY']
+        return _brotli().compress(body, quality=quality)
+    level = config['COMPRESS_CACHED_LEVEL'] if cached else config['COMPRESS_LEVEL']
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def compressible(response):
+    """Whether ``response`` is a complete 200 of a compressible type, not yet encoded."""
+    return (
+        response.status_code == 200
+        and response.mimetype in COMPRESSIBLE_TYPES
+        and (not response.is_streamed or response.direct_passthrough)
+        and 'Content-Encoding' not in response.headers
+        and 'Range' not in request.headers
+    )
+
+
+def apply_encoding(response, body, encoding):
+    """
+    Replace the body of ``response`` with its ``encoding`` form.
+
+    A strong ETag is made weak: the compressed bytes differ from the
+    identity ones, but both represent the same version for revalidation.
+    """
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def compress_response(response):
+    """
+    ``after_request`` hook compressing eligible responses once per request.
+
+    Responses already encoded (``response_cache`` hits served from a stored
+    variant, the prebuilt API spec) are left alone.
+    """
+    if response.mimetype in COMPRESSIBLE_TYPES:
+        response.vary.add('Accept-Encoding')
+    if request.method != 'GET' or not compressible(response):
+        return response
+    if response.direct_passthrough:
+        response.direct_passthrough = False  # Read the file so it can be compressed (Swagger UI assets)
+    body = response.get_data()
+    if len(body) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = negotiate()
+    if encoding is None:
+        return response
+    return apply_encoding(response, compress(body, encoding), encoding)
+
+
+def init_compression(app):
+    """Compress the responses of ``app`` according to the ``COMPRESS_*`` settings."""
+    if app.config['COMPRESS_ALGORITHMS']:
+        app.after_request(compress_response)
@@ -10,11 +10,61 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///site.db')  # Use environment variable for production database URI
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool shared by the worker's threads; size it to the server's thread count.
+    # Merged into SQLALCHEMY_ENGINE_OPTIONS by create_app unless the final database URI is
+    # in-memory SQLite, which uses a single static connection and takes no pool options.
+    SQLALCHEMY_POOL_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': 30,  # Seconds to wait for a free connection
+        'pool_recycle': 3600,
+        'pool_use_lifo': True,  # Reuse warm connections (SQLite page cache) first
+    }
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # Other engine options, applied as given
+
+    # Read replica for public GETs, e.g. 'sqlite:///file:replica.db?mode=ro&uri=true' or a replica server URL
+    READ_REPLICA_BIND = 'replica'
+    SQLALCHEMY_BINDS = {READ_REPLICA_BIND: os.getenv('DATABASE_REPLICA_URL')} if os.getenv('DATABASE_REPLICA_URL') else {}
+    READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))  # Reads stay on the primary this long after a commit
+
+    # SQLite profile, applied to every new connection (see database.py)
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'wal')  # Readers no longer block on the writer
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'normal')  # Safe with WAL, far fewer fsyncs than 'full'
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # Milliseconds to wait for a lock before 'database is locked'
+    SQLITE_CACHE_SIZE = -64000  # Page cache per connection; negative means KiB (64 MB)
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # Bytes of the database file read through mmap
+    SQLITE_TEMP_STORE = 'memory'  # Temporary tables and sort spills
+
     # JWT for authentication
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')  # Fetch from environment variable
+    PROPAGATE_EXCEPTIONS = True  # Let JWTManager's handlers answer 401/422 instead of Flask-RESTful's 500
+
+    # Password hashing runs in a bounded pool so login floods cannot take every worker thread
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # Werkzeug method string; older hashes are upgraded at login
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = 2  # Threads deriving keys concurrently
+    PASSWORD_HASH_QUEUE_SIZE = 8  # Hash/verify calls in flight or waiting; beyond this login answers 429
+    PASSWORD_HASH_TIMEOUT = 10  # Seconds a request waits for its hash
+
+    # Admin status is read from the token's is_admin claim and re-checked against
+    # the database at most once per TTL per worker, which bounds revocation delay
+    AUTH_USER_STATUS_TTL = 30  # Seconds
+    AUTH_USER_STATUS_CACHE_SIZE = 1024
 
     # File upload settings
-    UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')  # This might not be needed now if you're not uploading files
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.getcwd(), 'uploads'))  # Root of the content-addressed media store
+    MEDIA_GC_GRACE_SECONDS = 3600  # `flask media gc` keeps unreferenced files younger than this
+    MEDIA_URL = '/media/'  # Prefix of media URLs in API responses (srcset values), served by the media blueprint
+    MEDIA_SENDFILE_MODE = os.getenv('MEDIA_SENDFILE_MODE', 'direct')  # 'direct' (wsgi.file_wrapper), 'x-sendfile' or 'x-accel' (nginx)
+    MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')  # Internal nginx location aliasing UPLOAD_FOLDER
+    MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # Content-addressed files never change
+    MEDIA_MAX_AGE = 3600  # Legacy, non-hashed upload paths
+
+    # Responsive image variants, rendered off the request path after upload
+    IMAGE_EXECUTOR = os.getenv('IMAGE_EXECUTOR', 'thread')  # 'thread', 'process', 'jobs' (durable queue) or 'sync' (inline, for tests)
+    IMAGE_WORKERS = 2
+    IMAGE_VARIANT_WIDTHS = (320, 640, 1280)  # Never upscaled past the original width
+    IMAGE_QUALITY = 82  # JPEG / WebP quality
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max upload limit (still useful for other file uploads)
 
     # Allowed extensions (for photos, if any)
@@ -23,6 +73,69 @@ class Config:
     # Individual file size limits (for photos, if needed)
     MAX_PHOTO_SIZE = 5 * 1024 * 1024  # 5 MB for photo uploads (optional)
 
+    # API documentation: 'dynamic' (Swagger UI at /apidocs/, spec built at start-up), 'static' (only the
+    # file written by `flask apidocs build`, served precompressed at /apispec_1.json; for production) or 'off'
+    API_DOCS_MODE = os.getenv('API_DOCS_MODE', 'dynamic')
+    API_SPEC_FILE = os.getenv('API_SPEC_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'apispec.json'))
+    API_SPEC_MAX_AGE = 300  # Seconds clients may reuse the spec before revalidating its ETag
+    API_TITLE = 'Thunguri API'
+    API_VERSION = '1.0'
+
+    # Keyset pagination for list endpoints (?limit=&after=)
+    PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT', 50))  # Page size for ?after= without ?limit=; lists without either are not paged
+    PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', 500))  # Upper bound for ?limit=
+    SITE_BUNDLE_LIMIT = int(os.getenv('SITE_BUNDLE_LIMIT', 10))  # Rows per list section of /api/site-bundle by default
+    STREAM_CHUNK_SIZE = 500  # Rows fetched per batch when streaming a list (?stream=1)
+
+    # Bulk create/update/delete endpoints (/api/<resource>/bulk)
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 5000))  # Items accepted per bulk request
+
+    # Full-text search (/api/search)
+    SEARCH_DEFAULT_LIMIT = 20  # Results per page when no limit is given
+    SEARCH_MAX_LIMIT = 100  # Upper bound for ?limit=
+
+    # Delta sync (/api/changes?since=) from the change log written with every content change
+    CHANGES_DEFAULT_LIMIT = int(os.getenv('CHANGES_DEFAULT_LIMIT', 200))  # Log entries read per request when no limit is given, capped by PAGE_MAX_LIMIT
+    CHANGES_RETENTION_DAYS = int(os.getenv('CHANGES_RETENTION_DAYS', 90))  # `flask changes prune` default; older cursors get 410 and resync in full
+
+    # Background job queue in the application database (`flask jobs worker`)
+    JOBS_POLL_INTERVAL = 1.0  # Seconds an idle worker sleeps between polls
+    JOBS_LEASE_SECONDS = 300  # A running job not finished within its lease is handed to another worker
+    JOBS_MAX_ATTEMPTS = 5  # Runs before a failing job is marked failed
+    JOBS_BACKOFF_BASE = 10  # Seconds before the first retry, doubled on each attempt
+    JOBS_BACKOFF_MAX = 3600
+
+    # Response cache for public GET endpoints ('lru' per process, 'redis' shared by all workers, 'null' to disable)
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'lru')
+    RESPONSE_CACHE_SIZE = 1024  # Max entries held by the in-process LRU backend
+    RESPONSE_CACHE_TTL = 300  # Seconds, bounds staleness of other workers' LRU copies
+    RESPONSE_CACHE_REDIS_URL = os.getenv('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Response compression, negotiated from Accept-Encoding ('br' needs the brotli package, skipped if missing)
+    COMPRESS_ALGORITHMS = [a for a in os.getenv('COMPRESS_ALGORITHMS', 'br,gzip').split(',') if a]  # Preference order, empty disables
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 500))  # Bytes, smaller bodies are sent as-is
+    COMPRESS_LEVEL = 6  # gzip level for responses compressed on every request
+    COMPRESS_BR_QUALITY = 4  # Brotli quality for responses compressed on every request
+    COMPRESS_CACHED_LEVEL = 9  # gzip level for variants stored in the response cache, paid once per content version
+    COMPRESS_CACHED_BR_QUALITY = 11  # Brotli quality for variants stored in the response cache
+
+    # Request and SQL metrics served at /api/metrics in Prometheus text format
+    METRICS_MODE = os.getenv('METRICS_MODE', 'process')  # 'process' (per worker), 'multiprocess' (merged through METRICS_DIR) or 'off'
+    METRICS_DIR = os.getenv('METRICS_DIR', '/tmp/thunguri-metrics')  # One file per process; clear it on deploy
+    METRICS_FLUSH_INTERVAL = 5  # Seconds between writes of a process's file in multiprocess mode
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # If set, scrapers must send "Authorization: Bearer <token>"
+    METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+    METRICS_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)  # Bytes
+    METRICS_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)  # Statements per request
+
+    # Per-request SQL audit for tests and staging: query budgets declared on resources and N+1 detection
+    QUERY_AUDIT_MODE = os.getenv('QUERY_AUDIT_MODE', 'off')  # 'off', 'warn' (log + X-Query-Audit header) or 'raise'
+    QUERY_AUDIT_N_PLUS_ONE = 3  # Executions of one statement with different parameters reported as N+1
+
+    # Encoded JSON of single rows, keyed by row version; list pages are joined from these fragments
+    ROW_CACHE_SIZE = int(os.getenv('ROW_CACHE_SIZE', 50000))  # Max rows held per worker process
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'stdlib')  # 'stdlib', 'orjson' or 'module:function' returning bytes
+
     # You can add more settings related to external services for video URLs (like YouTube, Vimeo API keys, etc.)
 
 
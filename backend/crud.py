@@ -0,0 +1,321 @@
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from models import db
+from apidocs import bulk_docs, crud_docs
+from auth import admin_required
+from changelog import record_changes
+from fieldsets import item_response, make_serializer
+from http_cache import conditional
+from pagination import paginated_list
+from response_cache import invalidate_on_commit, response_cache
+from routing import mark_written, replica_reads
+from versioning import bump_table_versions
+
+
+class CrudSpec:
+    """
+    Declaration of a model exposed through ``crud_resource``.
+
+    Attributes:
+        model (db.Model): The model served by the resource.
+        fields (tuple): Fields exposed by the API, in response order.
+        label (str): Human readable name used in response messages.
+        required (tuple): Fields that must be present when creating a row.
+        read_only (tuple): Fields computed by the server, never written by clients.
+    """
+
+    def __init__(self, model, fields, label, required=(), read_only=()):
+        self.model = model
+        self.fields = tuple(fields)
+        self.label = label
+        self.required = tuple(required)
+        self.read_only = ('id',) + tuple(read_only)
+        self.writable = tuple(field for field in self.fields if field not in self.read_only)
+
+    def missing_fields(self, data):
+        """Return the required fields absent from a create payload."""
+        return [field for field in self.required if data.get(field) in (None, '')]
+
+
+# Every model registered through crud_resource, keyed by table name
+registry = {}
+
+
+def crud_resource(model, fields, label, required=(), read_only=()):
+    """
+    Build the Flask-RESTful resource serving CRUD for one model.
+
+    Reads run Core ``select()`` statements and serialize ``Row`` tuples with
+    the model's compiled serializer; writes go through the ORM session so the
+    versioning and cache invalidation hooks see them.
+
+    Args:
+        model (db.Model): The model to expose.
+        fields (tuple): Fields exposed by the API, in response order.
+        label (str): Human readable name used in response messages.
+        required (tuple): Fields that must be present when creating a row.
+        read_only (tuple): Fields computed by the server, never written by clients.
+
+    Returns:
+        type: A ``Resource`` subclass named ``<Model>Resource``.
+    """
+    spec = CrudSpec(model, fields, label, required, read_only)
+    make_serializer(model, spec.fields)  # Compile the full-row serializer at startup
+    registry[model.__tablename__] = spec
+
+    class CrudResource(Resource):
+        # Statements per request, enforced by QUERY_AUDIT_MODE: a cold list reads
+        # the table version, the page keys and the changed rows; writes may add
+        # the admin status lookup, the change log entry and the first table version insert
+        query_budget = {'get': 3, 'post': 6, 'put': 6, 'delete': 6}
+
+        @jwt_required(optional=True)
+        @replica_reads
+        @response_cache.cached(model)
+        @conditional(model)
+        def get(self, item_id=None):
+            """Guests and Admins can view one item or a page of items."""
+            if item_id:
+                return item_response(model, item_id, spec.fields)
+            return paginated_list(model, spec.fields)
+
+        @admin_required
+        def post(self):
+            """Admin-only: Create an item."""
+            data = request.get_json() or {}
+            missing = spec.missing_fields(data)
+            if missing:
+                return {'error': f"Missing fields: {', '.join(missing)}"}, 400
+
+            item = model(**{field: data.get(field) for field in spec.writable})
+            db.session.add(item)
+            db.session.commit()
+
+            return {'message': f'{label} added successfully', 'id': item.id}, 201
+
+        @admin_required
+        def put(self, item_id):
+            """Admin-only: Update an existing item."""
+            item = db.get_or_404(model, item_id)
+            data = request.get_json() or {}
+            for field in spec.writable:
+                if field in data:
+                    setattr(item, field, data[field])
+
+            db.session.commit()
+            return {'message': f'{label} updated successfully'}, 200
+
+        @admin_required
+        def delete(self, item_id):
+            """Admin-only: Delete an item."""
+            item = db.get_or_404(model, item_id)
+            db.session.delete(item)
+            db.session.commit()
+
+            return {'message': f'{label} deleted successfully'}, 200
+
+    for method, operation in crud_docs(spec).items():
+        getattr(CrudResource, method).specs_dict = operation
+    CrudResource.spec = spec
+    CrudResource.__name__ = CrudResource.__qualname__ = f'{model.__name__}Resource'
+    return CrudResource
+
+
+class BulkError(ValueError):
+    """Raised when a bulk request body cannot be parsed."""
+
+
+def read_bulk_items():
+    """
+    Parse a bulk request body.
+
+    Accepts a JSON array or newline-delimited JSON (``application/x-ndjson``),
+    one object per line.
+
+    Returns:
+        list: The decoded items.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise BulkError(f'Invalid JSON on line {number}')
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            raise BulkError('Expected a JSON array or an NDJSON body')
+
+    if not items:
+        raise BulkError('No items given')
+    if len(items) > current_app.config['BULK_MAX_ITEMS']:
+        raise BulkError(f"At most {current_app.config['BULK_MAX_ITEMS']} items per request")
+    return items
+
+
+def _core_write_done(model, op, ids):
+    # Core statements bypass the session flush hooks; do their work here
+    session = db.session()
+    record_changes(session.connection(), model, op, ids)
+    bump_table_versions(session.connection(), [model.__tablename__])
+    invalidate_on_commit(session, model.__tablename__)
+    mark_written(session)
+
+
+def _existing_ids(model, ids):
+    id_column = model.__table__.c.id
+    return set(db.session.execute(select(id_column).where(id_column.in_(ids))).scalars())
+
+
+def _validated_ids(model, items):
+    # Returns (ids, errors), with one error entry per invalid or unknown item
+    candidates = []
+    errors = []
+    for index, item in enumerate(items):
+        item_id = item.get('id') if isinstance(item, dict) else item
+        if isinstance(item_id, bool) or not isinstance(item_id, int):
+            errors.append({'index': index, 'error': 'Missing or invalid id'})
+        else:
+            candidates.append((index, item_id))
+
+    found = _existing_ids(model, [item_id for _, item_id in candidates]) if candidates else set()
+    errors.extend(
+        {'index': index, 'id': item_id, 'error': 'Not found'}
+        for index, item_id in candidates if item_id not in found
+    )
+    errors.sort(key=lambda error: error['index'])
+    return [item_id for _, item_id in candidates], errors
+
+
+def bulk_resource(resource):
+    """
+    Build the bulk endpoint for a resource created by ``crud_resource``.
+
+    ``POST`` inserts, ``PUT`` updates (items carry their ``id``) and
+    ``DELETE`` removes ``{"ids": [...]}``. Every item is validated first and
+    the batch is written in a single transaction with multi-row Core
+    statements; if any item is invalid nothing is written and the per-item
+    errors are returned.
+
+    Args:
+        resource (type): A resource returned by ``crud_resource``.
+
+    Returns:
+        type: A ``Resource`` subclass named ``<Model>BulkResource``.
+    """
+    spec = resource.spec
+    model = spec.model
+    table = model.__table__
+
+    class BulkResource(Resource):
+        query_budget = 6  # Batched statements: up to BULK_MAX_ITEMS items fit one INSERT and one UPDATE per changed-field set
+
+        @admin_required
+        def post(self):
+            """Admin-only: Create many items in one transaction."""
+            try:
+                items = read_bulk_items()
+            except BulkError as e:
+                return {'error': str(e)}, 400
+
+            errors = []
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    errors.append({'index': index, 'error': 'Expected an object'})
+                elif spec.missing_fields(item):
+                    errors.append({'index': index, 'error': f"Missing fields: {', '.join(spec.missing_fields(item))}"})
+            if errors:
+                return {'error': 'Validation failed', 'results': errors}, 400
+
+            now = datetime.utcnow()
+            rows = [
+                dict({field: item.get(field) for field in spec.writable}, version=1, updated_at=now)
+                for item in items
+            ]
+            # Multi-row INSERT ... VALUES statements, each as large as the driver's bound
+            # parameter limit allows. Ids are assigned in VALUES order but RETURNING does
+            # not guarantee its own, hence the sort.
+            connection = db.session.connection()
+            per_statement = max(1, connection.dialect.insertmanyvalues_max_parameters // len(rows[0]))
+            ids = []
+            for start in range(0, len(rows), per_statement):
+                statement = insert(table).values(rows[start:start + per_statement]).returning(table.c.id)
+                ids += sorted(connection.execute(statement).scalars())
+            _core_write_done(model, 'insert', ids)
+            db.session.commit()
+
+            results = [{'index': index, 'id': item_id, 'status': 201} for index, item_id in enumerate(ids)]
+            return {'message': f'{len(ids)} items added successfully', 'results': results}, 201
+
+        @admin_required
+        def put(self):
+            """Admin-only: Update many items in one transaction."""
+            try:
+                items = read_bulk_items()
+            except BulkError as e:
+                return {'error': str(e)}, 400
+            if not all(isinstance(item, dict) for item in items):
+                return {'error': 'Expected an array of objects'}, 400
+
+            ids, errors = _validated_ids(model, items)
+            if errors:
+                return {'error': 'Validation failed', 'results': errors}, 400
+
+            # executemany needs identical parameter sets, so group items by the fields they change
+            now = datetime.utcnow()
+            groups = {}
+            for item in items:
+                fields = tuple(field for field in spec.writable if field in item)
+                params = {f'p_{field}': item[field] for field in fields}
+                groups.setdefault(fields, []).append(dict(params, p_id=item['id']))
+
+            connection = db.session.connection()
+            for fields, params in groups.items():
+                statement = (
+                    update(table)
+                    .where(table.c.id == bindparam('p_id'))
+                    .values({field: bindparam(f'p_{field}') for field in fields})
+                    .values(version=table.c.version + 1, updated_at=now)
+                )
+                connection.execute(statement, params)
+            _core_write_done(model, 'update', ids)
+            db.session.commit()
+
+            results = [{'index': index, 'id': item_id, 'status': 200} for index, item_id in enumerate(ids)]
+            return {'message': f'{len(ids)} items updated successfully', 'results': results}, 200
+
+        @admin_required
+        def delete(self):
+            """Admin-only: Delete items by id in one transaction."""
+            data = request.get_json(silent=True) or {}
+            items = data.get('ids') if isinstance(data, dict) else None
+            if not isinstance(items, list) or not items:
+                return {'error': "Expected a JSON body like {\"ids\": [1, 2, 3]}"}, 400
+            if len(items) > current_app.config['BULK_MAX_ITEMS']:
+                return {'error': f"At most {current_app.config['BULK_MAX_ITEMS']} items per request"}, 400
+
+            ids, errors = _validated_ids(model, items)
+            if errors:
+                return {'error': 'Validation failed', 'results': errors}, 400
+
+            db.session.connection().execute(delete(table).where(table.c.id.in_(ids)))
+            _core_write_done(model, 'delete', ids)
+            db.session.commit()
+
+            results = [{'index': index, 'id': item_id, 'status': 200} for index, item_id in enumerate(ids)]
+            return {'message': f'{len(ids)} items deleted successfully', 'results': results}, 200
+
+    for method, operation in bulk_docs(spec).items():
+        getattr(BulkResource, method).specs_dict = operation
+    BulkResource.spec = spec
+    BulkResource.__name__ = BulkResource.__qualname__ = f'{model.__name__}BulkResource'
+    return BulkResource
@@ -0,0 +1,81 @@
+from functools import partial
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from models import db
+
+
+def takes_pool_options(uri):
+    """False for in-memory SQLite, whose static connection pool rejects sizing options."""
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        return True
+    return url.database not in (None, '', ':memory:') and url.query.get('mode') != 'memory'
+
+
+def engine_options(config):
+    """
+    ``SQLALCHEMY_ENGINE_OPTIONS`` for the final database URI.
+
+    Built when the app is created rather than when ``Config`` is defined, so a
+    config subclass switching to in-memory SQLite does not inherit pool options.
+
+    Args:
+        config (Config): Application config.
+
+    Returns:
+        dict: ``SQLALCHEMY_POOL_OPTIONS`` if the URI takes them, then ``SQLALCHEMY_ENGINE_OPTIONS``.
+    """
+    options = {}
+    if takes_pool_options(config['SQLALCHEMY_DATABASE_URI']):
+        options.update(config.get('SQLALCHEMY_POOL_OPTIONS', {}))
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    return options
+
+
+def sqlite_pragmas(config, read_only=False):
+    """
+    PRAGMA statements run on every new SQLite connection.
+
+    WAL lets readers proceed while a write transaction is open, and
+    ``synchronous=NORMAL`` is durable in WAL mode except for the last
+    transactions before a power loss. ``busy_timeout`` makes a writer wait for
+    the lock instead of failing with ``database is locked``.
+
+    Args:
+        config (Config): Application config holding the ``SQLITE_*`` settings.
+        read_only (bool): Skip the PRAGMAs that write to the database file (read replica).
+
+    Returns:
+        list: The statements, in execution order.
+    """
+    statements = [f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}"]
+    if not read_only:
+        statements += [
+            f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}",
+            f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        ]
+    return statements + [
+        f"PRAGMA cache_size = {int(config['SQLITE_CACHE_SIZE'])}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA temp_store = {config['SQLITE_TEMP_STORE']}",
+    ]
+
+
+def _apply_pragmas(statements, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in statements:
+            cursor.execute(statement)
+    finally:
+        cursor.close()
+
+
+def configure_engines(app):
+    """Install the SQLite connection profile on every SQLite engine of the app."""
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                statements = sqlite_pragmas(app.config, read_only=key == app.config['READ_REPLICA_BIND'])
+                event.listen(engine, 'connect', partial(_apply_pragmas, statements))
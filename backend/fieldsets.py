@@ -0,0 +1,118 @@
+from functools import lru_cache
+
+from flask import abort, current_app, request
+from sqlalchemy import Date, DateTime, select
+
+from models import db
+
+
+class FieldsetError(ValueError):
+    """Raised when ``?fields=`` names a field the resource does not expose."""
+
+
+def requested_fields(available):
+    """
+    Resolve the ``?fields=`` query parameter against a resource's fields.
+
+    ``id`` is always included because list cursors are built from it. The
+    declared field order is kept so equal requests serialize identically.
+
+    Args:
+        available (tuple): Every field the resource exposes.
+
+    Returns:
+        tuple: The fields to load and serialize.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return available
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = sorted(names.difference(available))
+    if unknown:
+        raise FieldsetError(f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(field for field in available if field in names or field == 'id')
+
+
+def project(model, fields):
+    """
+    Build a Core SELECT of exactly the columns behind ``fields``.
+
+    Args:
+        model (db.Model): The model being read.
+        fields (tuple): Fields returned by ``requested_fields``.
+
+    Returns:
+        Select: Statement yielding ``Row`` tuples in ``fields`` order.
+    """
+    columns = model.__table__.c
+    return select(*(columns[field] for field in fields))
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _srcset(value):
+    # {format: {width: path}} -> {format: "url 320w, url 640w"}
+    if not value:
+        return None
+    media_url = current_app.config['MEDIA_URL']
+    return {
+        fmt: ', '.join(f'{media_url}{widths[width]} {width}w' for width in sorted(widths, key=int))
+        for fmt, widths in value.items()
+    }
+
+
+@lru_cache(maxsize=None)
+def make_serializer(model, fields):
+    """
+    Compile a serializer turning a ``Row`` of ``project(model, fields)`` into a dict.
+
+    Dates and image variants get a converter; every other value is passed
+    through as-is. Serializers are cached per model and fieldset, and the
+    full fieldset of each resource is compiled at registration time.
+    """
+    columns = model.__table__.c
+    converters = []
+    for index, field in enumerate(fields):
+        if isinstance(columns[field].type, (Date, DateTime)):
+            converters.append((index, _isoformat))
+        elif columns[field].info.get('srcset'):
+            converters.append((index, _srcset))
+
+    if not converters:
+        def serialize(row):
+            return dict(zip(fields, row))
+        return serialize
+
+    def serialize(row):
+        values = list(row)
+        for index, convert in converters:
+            values[index] = convert(values[index])
+        return dict(zip(fields, values))
+    return serialize
+
+
+def item_response(model, item_id, available):
+    """
+    Return one row of ``model`` restricted to the requested fields.
+
+    Args:
+        model (db.Model): The model to read.
+        item_id (int): Primary key of the row.
+        available (tuple): Every field the resource exposes.
+
+    Returns:
+        Response or tuple: The row's JSON, 400 for an unknown field, 404 if the row does not exist.
+    """
+    from fragments import json_response, keyed_select, row_fragments  # fragments builds on this module
+
+    try:
+        fields = requested_fields(available)
+    except FieldsetError as e:
+        return {'error': str(e)}, 400
+    statement = keyed_select(model, fields).where(model.__table__.c.id == item_id)
+    row = db.session.execute(statement).first()
+    if row is None:
+        abort(404)
+    return json_response(row_fragments.item(model, fields, row))
@@ -0,0 +1,182 @@
+import json
+import threading
+from importlib import import_module
+
+from flask import Response, current_app
+from sqlalchemy import select
+
+from fieldsets import make_serializer, project
+from models import db
+from response_cache import LRUCache
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _orjson_dumps(obj):
+    import orjson
+    return orjson.dumps(obj)
+
+
+_ENCODERS = {'stdlib': _stdlib_dumps, 'orjson': _orjson_dumps}
+
+
+def json_encoder():
+    """
+    The configured ``obj -> bytes`` JSON encoder.
+
+    ``JSON_ENCODER`` is ``'stdlib'``, ``'orjson'`` or a ``'module:function'``
+    path to any callable returning UTF-8 encoded JSON bytes.
+    """
+    encoder = current_app.extensions.get('json_encoder')
+    if encoder is None:
+        name = current_app.config['JSON_ENCODER']
+        if name in _ENCODERS:
+            encoder = _ENCODERS[name]
+        else:
+            module, _, attribute = name.partition(':')
+            encoder = getattr(import_module(module), attribute)
+        current_app.extensions['json_encoder'] = encoder
+    return encoder
+
+
+def dumps(obj):
+    """Encode ``obj`` to JSON bytes with the configured encoder."""
+    return json_encoder()(obj)
+
+
+class FragmentCache:
+    """
+    Encoded JSON of single rows, keyed by row version.
+
+    A key holds the table, the fieldset, the id, and the row's version and
+    ``updated_at``, so an updated row (or a new row reusing a deleted id)
+    gets a new key: entries never need invalidation and old ones age out of
+    the LRU.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _store(self):
+        store = current_app.extensions.get('row_fragments')
+        if store is None:
+            store = LRUCache(maxsize=current_app.config['ROW_CACHE_SIZE'], ttl=0)
+            current_app.extensions['row_fragments'] = store
+        return store
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._store()._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def rows(self, model, fields, keys):
+        """
+        Encoded JSON of the rows behind ``keys``, in order.
+
+        Args:
+            model (db.Model): A ``VersionedMixin`` model.
+            fields (tuple): Fields to include, see ``fieldsets.requested_fields``.
+            keys (list): ``(id, version, updated_at)`` rows.
+
+        Returns:
+            list: One ``bytes`` object per key; rows deleted meanwhile are skipped.
+        """
+        fragments = self.by_id(model, fields, keys)
+        return [fragments[row_id] for row_id, _, _ in keys if row_id in fragments]
+
+    def by_id(self, model, fields, keys):
+        """
+        Encoded JSON of the rows behind ``keys``, keyed by id.
+
+        Rows missing from the cache are loaded with one ``id IN (...)``
+        query, serialized and encoded, then cached.
+
+        Returns:
+            dict: Id to ``bytes``; rows deleted meanwhile are absent.
+        """
+        store = self._store()
+        table = model.__tablename__
+        fragments = {}
+        missing = []
+        for row_id, version, updated_at in keys:
+            fragment = store.get((table, fields, row_id, version, updated_at))
+            if fragment is None:
+                missing.append(row_id)
+            else:
+                fragments[row_id] = fragment
+        self._count(len(fragments), len(missing))
+
+        if missing:
+            statement = keyed_select(model, fields).where(model.__table__.c.id.in_(missing))
+            for row in db.session.execute(statement):
+                fragments[row.id] = self.encode(model, fields, row)
+        return fragments
+
+    def encode(self, model, fields, row):
+        """
+        Encode and cache one row of ``keyed_select(model, fields)``.
+
+        Returns:
+            bytes: The row's JSON object.
+        """
+        fragment = json_encoder()(make_serializer(model, fields)(row[:len(fields)]))
+        key = (model.__tablename__, fields, row.id, row.row_version, row.row_updated_at)
+        self._store().set(key, fragment)
+        return fragment
+
+    def item(self, model, fields, row):
+        """Encoded JSON of one row of ``keyed_select(model, fields)``, from the cache if unchanged."""
+        key = (model.__tablename__, fields, row.id, row.row_version, row.row_updated_at)
+        fragment = self._store().get(key)
+        if fragment is None:
+            self._count(0, 1)
+            return self.encode(model, fields, row)
+        self._count(1, 0)
+        return fragment
+
+    def clear(self):
+        store = current_app.extensions.get('row_fragments')
+        if store is not None:
+            store.clear()
+
+
+row_fragments = FragmentCache()
+
+
+def version_keys(model):
+    """Core SELECT of the ``(id, version, updated_at)`` keys of a model."""
+    columns = model.__table__.c
+    return select(columns.id, columns.version, columns.updated_at)
+
+
+def keyed_select(model, fields):
+    """``project(model, fields)`` followed by the row's ``version`` and ``updated_at``."""
+    columns = model.__table__.c
+    # Labelled, so a fieldset that already contains them keeps its own columns
+    return project(model, fields).add_columns(
+        columns.version.label('row_version'), columns.updated_at.label('row_updated_at')
+    )
+
+
+def json_response(body, status=200, headers=None):
+    """Wrap encoded JSON bytes in a response, bypassing Flask-RESTful's encoder."""
+    return Response(body, status=status, headers=headers, mimetype='application/json')
+
+
+def list_response(model, fields, keys, headers=None):
+    """Assemble a JSON array response from cached row fragments, without re-encoding."""
+    return json_response(b'[' + b','.join(row_fragments.rows(model, fields, keys)) + b']', headers=headers)
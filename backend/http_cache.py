@@ -0,0 +1,85 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, request
+from flask_restful.utils import unpack
+from werkzeug.http import http_date
+
+from versioning import get_row_version, get_table_version
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from version parts and the request path and query.
+
+    The query string is part of the tag because pagination and other
+    parameters change the representation of the same rows.
+    """
+    raw = ':'.join(str(part) for part in parts) + ':' + request.full_path
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def validator_headers(etag, last_modified):
+    """Headers sent with every conditional-capable GET response."""
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified.replace(tzinfo=timezone.utc))
+    return headers
+
+
+def is_not_modified(etag, last_modified):
+    """
+    Evaluate ``If-None-Match`` / ``If-Modified-Since`` against the validators.
+
+    ``If-None-Match`` takes precedence and uses weak comparison, as required
+    by RFC 9110, so the weakened tag of a compressed response still matches.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+        return modified <= request.if_modified_since
+    return False
+
+
+def conditional(model):
+    """
+    Decorator adding ETag / Last-Modified validation to a resource GET.
+
+    Lists are validated against the table version and single items against
+    the row version. A matching request is answered with 304 before the
+    handler runs, so the rows are never loaded or serialized.
+
+    Args:
+        model (db.Model): The ``VersionedMixin`` model served by the handler.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            row_id = kwargs.get('item_id')  # The item routes of crud_resource
+            if row_id is None:
+                version, last_modified = get_table_version(model)
+            else:
+                found = get_row_version(model, row_id)
+                if found is None:
+                    return fn(*args, **kwargs)  # Let the handler produce its 404
+                version, last_modified = found
+
+            etag = make_etag(model.__tablename__, row_id, version, last_modified)
+            headers = validator_headers(etag, last_modified)
+            if is_not_modified(etag, last_modified):
+                return Response(status=304, headers=headers)
+
+            rv = fn(*args, **kwargs)
+            if isinstance(rv, Response):
+                if rv.status_code == 200:
+                    rv.headers.extend(headers)
+                return rv
+            data, code, extra_headers = unpack(rv)
+            if code != 200:
+                return rv
+            headers.update(extra_headers or {})
+            return data, code, headers
+        return wrapper
+    return decorator
@@ -0,0 +1,257 @@
+import logging
+import os
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from jobs import enqueue, task
+from models import db
+from storage import MEDIA_COLUMNS, UploadError, absolute_path
+
+logger = logging.getLogger(__name__)
+
+# Raster fallback format per uploaded extension; every image also gets WebP
+_FALLBACK_FORMATS = {'jpg': 'jpg', 'png': 'png', 'gif': 'png'}
+
+_EXIF_ORIENTATION = 0x0112
+
+_executor = None
+
+
+def variants_attribute(attribute):
+    """Name of the column holding the variants of a path column (photo_path -> photo_variants)."""
+    return attribute.rsplit('_', 1)[0] + '_variants'
+
+
+def variant_path(path, width, ext):
+    """Relative path of one variant, stored next to its original."""
+    base = os.path.splitext(path)[0]
+    return f'{base}_w{width}.{ext}'
+
+
+def _save_atomic(image, target, fmt, quality):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+    os.close(fd)
+    try:
+        if fmt == 'jpg':
+            image.save(tmp, 'JPEG', quality=quality, optimize=True, progressive=True)
+        elif fmt == 'webp':
+            image.save(tmp, 'WEBP', quality=quality, method=4)
+        else:
+            image.save(tmp, 'PNG', optimize=True)
+        os.replace(tmp, target)  # A concurrent render of the same variant wrote the same bytes
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def strip_metadata(path):
+    """
+    Rewrite an uploaded original without its metadata (EXIF with GPS, XMP, comments).
+
+    The EXIF orientation is applied first so the image still displays upright.
+    A JPEG without an orientation is re-encoded with its own quantization
+    tables, which keeps the loss negligible. Colour profiles are kept.
+
+    Args:
+        path (str): Absolute path of the image, replaced in place.
+
+    Raises:
+        UploadError: If the file is not a readable image.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        try:
+            original = Image.open(path)
+            original.load()
+        except (UnidentifiedImageError, OSError):
+            raise UploadError('Invalid image')
+        with original:
+            fmt = original.format
+            icc_profile = original.info.get('icc_profile')
+            for key in ('comment', 'exif', 'xmp', 'XML:com.adobe.xmp'):
+                original.info.pop(key, None)
+            if getattr(original, 'n_frames', 1) > 1:
+                original.save(tmp, fmt, save_all=True, comment=b'')  # Animated GIF: frames as they are
+            elif fmt == 'JPEG' and original.getexif().get(_EXIF_ORIENTATION, 1) == 1:
+                original.save(tmp, 'JPEG', quality='keep', icc_profile=icc_profile)
+            else:
+                image = ImageOps.exif_transpose(original)
+                image.info.pop('exif', None)
+                options = {'quality': 95} if fmt == 'JPEG' else {}
+                image.save(tmp, fmt, icc_profile=icc_profile, **options)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def build_variants(upload_folder, path, widths, quality=82):
+    """
+    Render the responsive variants of a stored image.
+
+    The orientation from EXIF is applied and all metadata is then dropped.
+    JPEGs are written progressive, and every width also gets a WebP copy.
+    Variants that already exist are reused (paths are content-addressed).
+    Each render writes its own temporary file and moves it into place, so
+    concurrent renders of one original (deduplicated uploads, several
+    workers) both succeed with identical files.
+
+    This runs in the image executor and must not touch the app or database.
+
+    Args:
+        upload_folder (str): Root of the media store.
+        path (str): Relative path of the original.
+        widths (tuple): Target widths in pixels, never upscaled.
+        quality (int): Lossy encoder quality.
+
+    Returns:
+        dict: ``{format: {width: relative_path}}``.
+    """
+    from PIL import Image, ImageOps
+
+    ext = path.rsplit('.', 1)[1].lower()
+    fallback = _FALLBACK_FORMATS.get(ext, 'png')
+    variants = {fallback: {}, 'webp': {}}
+
+    with Image.open(os.path.join(upload_folder, path)) as original:
+        image = ImageOps.exif_transpose(original)
+        if fallback == 'jpg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode == 'P':
+            image = image.convert('RGBA')
+
+        targets = sorted({min(width, image.width) for width in widths})
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+
+            for fmt in (fallback, 'webp'):
+                relative = variant_path(path, width, fmt)
+                target = os.path.join(upload_folder, relative)
+                if not os.path.exists(target):
+                    _save_atomic(resized, target, fmt, quality)
+                variants[fmt][str(width)] = relative
+    return variants
+
+
+def _get_executor(app):
+    global _executor
+    if _executor is None:
+        workers = app.config['IMAGE_WORKERS']
+        if app.config['IMAGE_EXECUTOR'] == 'process':
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='images')
+    return _executor
+
+
+def _store_variants(model, row_id, attribute, path, variants):
+    # Only if the row still uses this image; a newer upload has its own job
+    row = db.session.get(model, row_id)
+    if row is not None and getattr(row, attribute) == path:
+        setattr(row, variants_attribute(attribute), variants)
+        db.session.commit()
+
+
+def _save_variants(app, model, row_id, attribute, path, future):
+    # Runs once the variants are rendered by the executor
+    try:
+        variants = future.result()
+    except Exception:
+        logger.exception('Could not render variants of %s', path)
+        return
+
+    with app.app_context():
+        try:
+            _store_variants(model, row_id, attribute, path, variants)
+        finally:
+            db.session.remove()
+
+
+@task('images.render_variants', priority=10)
+def render_variants(table_name, row_id, attribute, path):
+    """Job rendering and attaching the variants of a row's image (IMAGE_EXECUTOR='jobs')."""
+    model = next(model for model, _ in MEDIA_COLUMNS if model.__tablename__ == table_name)
+    variants = build_variants(
+        current_app.config['UPLOAD_FOLDER'], path,
+        tuple(current_app.config['IMAGE_VARIANT_WIDTHS']), current_app.config['IMAGE_QUALITY']
+    )
+    _store_variants(model, row_id, attribute, path, variants)
+
+
+def process_image(model, row_id, attribute, path, app=None):
+    """
+    Render and attach the variants of a row's image in the background.
+
+    Args:
+        model (db.Model): Model owning the image column.
+        row_id (int): Id of the owning row.
+        attribute (str): Name of the path column.
+        path (str): Relative media path of the original.
+        app (Flask): Application, defaults to ``current_app``.
+
+    Returns:
+        Future: Resolves to the variants mapping.
+    """
+    app = app or current_app._get_current_object()
+    render = partial(
+        build_variants, app.config['UPLOAD_FOLDER'], path,
+        tuple(app.config['IMAGE_VARIANT_WIDTHS']), app.config['IMAGE_QUALITY']
+    )
+
+    if app.config['IMAGE_EXECUTOR'] == 'sync':
+        future = Future()
+        try:
+            future.set_result(render())
+        except Exception as e:
+            future.set_exception(e)
+    else:
+        future = _get_executor(app).submit(render)
+    future.add_done_callback(partial(_save_variants, app, model, row_id, attribute, path))
+    return future
+
+
+def _reset_variants(attribute, mapper, connection, target):
+    # Variants of the previous image must not outlive it
+    if inspect(target).attrs[attribute].history.has_changes():
+        setattr(target, variants_attribute(attribute), None)
+
+
+def _queue_if_changed(attribute, mapper, connection, target):
+    path = getattr(target, attribute)
+    if not path or not inspect(target).attrs[attribute].history.has_changes():
+        return
+    if not os.path.exists(absolute_path(path)):
+        return  # Legacy or external path, nothing to render
+    if current_app.config['IMAGE_EXECUTOR'] == 'jobs':
+        # Durable: the job commits with the row and survives restarts
+        enqueue(render_variants, (target.__tablename__, target.id, attribute, path), connection=connection)
+        return
+    session = object_session(target)
+    session.info.setdefault('image_jobs', []).append((type(target), target.id, attribute, path))
+
+
+for _model, _attribute in MEDIA_COLUMNS:
+    event.listen(_model, 'before_update', partial(_reset_variants, _attribute))
+    event.listen(_model, 'after_insert', partial(_queue_if_changed, _attribute))
+    event.listen(_model, 'after_update', partial(_queue_if_changed, _attribute))
+
+
+@event.listens_for(Session, 'after_commit')
+def _submit_image_jobs(session):
+    # Only start once the row is committed, so the worker can see it
+    for job in session.info.pop('image_jobs', ()):
+        process_image(*job)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_image_jobs(session):
+    session.info.pop('image_jobs', None)
@@ -0,0 +1,259 @@
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+jobs = Job.__table__
+
+# Every function decorated with @task, keyed by task name
+registry = {}
+
+
+class Task:
+    """
+    A function that can run in the background job worker.
+
+    Call it directly to run it inline, or call ``delay`` to enqueue it.
+    """
+
+    def __init__(self, fn, name, priority, max_attempts):
+        self.fn = fn
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.__doc__ = fn.__doc__
+        self.__name__ = fn.__name__
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Enqueue a run with these (JSON-serializable) arguments; see ``enqueue``."""
+        return enqueue(self, args, kwargs)
+
+
+def task(name=None, priority=0, max_attempts=None):
+    """
+    Decorator registering a function as a background job.
+
+    Jobs are delivered at least once: a job whose worker dies is claimed
+    again when its lease expires, so tasks must be idempotent.
+
+    Args:
+        name (str): Task name stored on the job, defaults to ``module.function``.
+        priority (int): Default priority; higher runs first.
+        max_attempts (int): Runs before the job is marked failed, defaults to ``JOBS_MAX_ATTEMPTS``.
+
+    Returns:
+        callable: Decorator returning a ``Task``.
+    """
+    def decorator(fn):
+        task_name = name or f'{fn.__module__}.{fn.__name__}'
+        registry[task_name] = Task(fn, task_name, priority, max_attempts)
+        return registry[task_name]
+    return decorator
+
+
+def enqueue(task, args=(), kwargs=None, priority=None, delay=0, connection=None):
+    """
+    Add a job to the queue.
+
+    The job is inserted on the session's connection (or ``connection``), so
+    it commits or rolls back together with the caller's writes; a job is
+    never run for a row that was not committed.
+
+    Args:
+        task (Task): The task to run.
+        args (tuple): Positional arguments.
+        kwargs (dict): Keyword arguments.
+        priority (int): Overrides the task's priority.
+        delay (float): Seconds before the job may run.
+        connection (Connection): Connection to insert on, e.g. inside flush events.
+
+    Returns:
+        int: Id of the new job.
+    """
+    now = datetime.utcnow()
+    values = dict(
+        task=task.name,
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=task.priority if priority is None else priority,
+        status='queued',
+        attempts=0,
+        max_attempts=task.max_attempts or current_app.config['JOBS_MAX_ATTEMPTS'],
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+    )
+    connection = connection or db.session.connection()
+    return connection.execute(insert(jobs).values(values).returning(jobs.c.id)).scalar_one()
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff with jitter before retry number ``attempts``."""
+    base = current_app.config['JOBS_BACKOFF_BASE']
+    delay = min(base * 2 ** (attempts - 1), current_app.config['JOBS_BACKOFF_MAX'])
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim(worker):
+    """
+    Atomically lease the next runnable job.
+
+    Queued jobs whose ``run_at`` has passed and running jobs whose lease
+    expired are eligible, highest priority first.
+
+    Returns:
+        Row: ``(id, task, args, kwargs, attempts, max_attempts)``, or None if the queue is idle.
+    """
+    now = datetime.utcnow()
+    runnable = or_(
+        and_(jobs.c.status == 'queued', jobs.c.run_at <= now),
+        and_(jobs.c.status == 'running', jobs.c.locked_until < now),
+    )
+    next_id = (
+        select(jobs.c.id).where(runnable)
+        .order_by(jobs.c.priority.desc(), jobs.c.run_at, jobs.c.id)
+        .limit(1).scalar_subquery()
+    )
+    statement = (
+        # Re-check eligibility so two workers racing for the same id cannot both win
+        update(jobs).where(jobs.c.id == next_id, runnable)
+        .values(
+            status='running', attempts=jobs.c.attempts + 1, locked_by=worker,
+            locked_until=now + timedelta(seconds=current_app.config['JOBS_LEASE_SECONDS']),
+        )
+        .returning(jobs.c.id, jobs.c.task, jobs.c.args, jobs.c.kwargs, jobs.c.attempts, jobs.c.max_attempts)
+    )
+    row = db.session.execute(statement).first()
+    db.session.commit()
+    return row
+
+
+def _finish(job_id, worker, **values):
+    # Only the lease holder may settle the job; a reclaimed job belongs to its new worker
+    db.session.execute(
+        update(jobs).where(jobs.c.id == job_id, jobs.c.locked_by == worker)
+        .values(locked_by=None, locked_until=None, **values)
+    )
+    db.session.commit()
+
+
+def run_job(job, worker):
+    """
+    Run one claimed job and record the outcome.
+
+    A failing job is retried with backoff until ``max_attempts`` is reached,
+    then marked failed; the traceback is kept in ``last_error``.
+
+    Returns:
+        bool: True if the job succeeded.
+    """
+    task = registry.get(job.task)
+    try:
+        if task is None:
+            raise LookupError(f'Unknown task {job.task!r}')
+        task(*job.args, **job.kwargs)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %s', job.id, job.task, job.attempts)
+        if task is not None and job.attempts < job.max_attempts:
+            retry_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(job.attempts))
+            _finish(job.id, worker, status='queued', run_at=retry_at, last_error=error)
+        else:
+            _finish(job.id, worker, status='failed', finished_at=datetime.utcnow(), last_error=error)
+        return False
+
+    _finish(job.id, worker, status='done', finished_at=datetime.utcnow())
+    return True
+
+
+def work(worker=None, once=False, poll_interval=None):
+    """
+    Process jobs until interrupted.
+
+    Args:
+        worker (str): Name recorded on leased jobs, defaults to ``host:pid``.
+        once (bool): Stop as soon as the queue is idle.
+        poll_interval (float): Seconds to sleep while the queue is idle.
+
+    Returns:
+        int: Number of jobs run.
+    """
+    worker = worker or f'{socket.gethostname()}:{os.getpid()}'
+    poll_interval = poll_interval or current_app.config['JOBS_POLL_INTERVAL']
+    count = 0
+    while True:
+        job = claim(worker)
+        if job is None:
+            if once:
+                return count
+            time.sleep(poll_interval)
+            continue
+        run_job(job, worker)
+        count += 1
+
+
+jobs_cli = AppGroup('jobs', help='Run and inspect background jobs.')
+
+
+@jobs_cli.command('worker')
+@click.option('--once', is_flag=True, help='Exit when the queue is empty.')
+@click.option('--name', default=None, help='Worker name recorded on leased jobs.')
+@click.option('--poll-interval', type=float, default=None, help='Seconds between polls of an idle queue.')
+def worker_command(once, name, poll_interval):
+    """Run queued jobs (at-least-once, highest priority first)."""
+    try:
+        count = work(name, once, poll_interval)
+    except KeyboardInterrupt:
+        return  # An interrupted job is leased and will be claimed again
+    click.echo(f'Ran {count} job(s)')
+
+
+@jobs_cli.command('status')
+def status_command():
+    """Show the number of jobs per task and status."""
+    rows = db.session.execute(
+        select(jobs.c.task, jobs.c.status, func.count()).group_by(jobs.c.task, jobs.c.status).order_by(jobs.c.task)
+    ).all()
+    for task_name, status, count in rows:
+        click.echo(f'{task_name:50} {status:10} {count}')
+    if not rows:
+        click.echo('No jobs')
+
+
+@jobs_cli.command('retry-failed')
+def retry_failed_command():
+    """Requeue every failed job with a fresh attempt budget."""
+    result = db.session.execute(
+        update(jobs).where(jobs.c.status == 'failed')
+        .values(status='queued', attempts=0, run_at=datetime.utcnow(), finished_at=None)
+    )
+    db.session.commit()
+    click.echo(f'Requeued {result.rowcount} job(s)')
+
+
+@jobs_cli.command('purge')
+@click.option('--older-than', type=int, default=7, show_default=True, help='Age in days.')
+def purge_command(older_than):
+    """Delete finished jobs older than the given age."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than)
+    result = db.session.execute(
+        delete(jobs).where(jobs.c.status.in_(('done', 'failed')), jobs.c.finished_at < cutoff)
+    )
+    db.session.commit()
+    click.echo(f'Deleted {result.rowcount} job(s)')
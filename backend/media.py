@@ -0,0 +1,87 @@
+import mimetypes
+import os
+import re
+
+from flask import Blueprint, Response, abort, current_app, request
+from werkzeug.security import safe_join
+from werkzeug.utils import send_from_directory
+
+# Content-addressed blobs and their variants: ab/cd/<sha256>.jpg, ab/cd/<sha256>_w640.webp
+_HASHED_PATH = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64}(?:_w\d+)?)\.[a-z0-9]+$')
+
+media_bp = Blueprint('media', __name__)
+
+
+def cache_headers(path):
+    """
+    Caching policy for one media path.
+
+    Content-addressed files never change, so they are cached for a year and
+    marked immutable with their hash as a strong ETag; any other file (legacy
+    uploads) gets a short max-age and is revalidated by mtime and size.
+
+    Returns:
+        tuple: ``(max_age, immutable, etag)``; ``etag`` is None for legacy paths.
+    """
+    match = _HASHED_PATH.match(path)
+    if match:
+        return current_app.config['MEDIA_IMMUTABLE_MAX_AGE'], True, match.group(1)
+    return current_app.config['MEDIA_MAX_AGE'], False, None
+
+
+def _accel_redirect(path, max_age, immutable, etag):
+    # nginx serves the file itself (sendfile, Range, If-None-Match); we only authorize it
+    response = Response(status=200)
+    response.headers['X-Accel-Redirect'] = current_app.config['MEDIA_ACCEL_PREFIX'] + path
+    response.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = immutable
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+@media_bp.route('/<path:path>', methods=['GET', 'HEAD'])
+def serve_media(path):
+    """
+    Serve an uploaded file from ``UPLOAD_FOLDER``.
+
+    ``MEDIA_SENDFILE_MODE`` picks who moves the bytes:
+
+    - ``direct``: Werkzeug streams the file through ``wsgi.file_wrapper``, so
+      servers like gunicorn use ``sendfile(2)``; Range and conditional
+      requests are answered here.
+    - ``x-sendfile``: an empty response with ``X-Sendfile`` (Apache, lighttpd).
+    - ``x-accel``: an empty response with ``X-Accel-Redirect`` to the
+      internal nginx location ``MEDIA_ACCEL_PREFIX``.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    # Rows written before the content-addressed store kept "uploads/<name>" paths
+    legacy_prefix = os.path.basename(os.path.normpath(upload_folder)) + '/'
+    if path.startswith(legacy_prefix) and not _HASHED_PATH.match(path):
+        path = path[len(legacy_prefix):]
+
+    full = safe_join(upload_folder, path)
+    if full is None:
+        abort(404)
+    # Checked on the normalised path, so "./.tmp/<name>" cannot reach uploads in progress
+    path = os.path.relpath(full, upload_folder).replace(os.sep, '/')
+    if path.split('/')[0] == '.tmp' or not os.path.isfile(full):
+        abort(404)
+
+    max_age, immutable, etag = cache_headers(path)
+    mode = current_app.config['MEDIA_SENDFILE_MODE']
+    if mode == 'x-accel':
+        return _accel_redirect(path, max_age, immutable, etag)
+
+    response = send_from_directory(
+        upload_folder, path, request.environ,
+        use_x_sendfile=mode == 'x-sendfile',
+        conditional=True,
+        etag=etag if etag else True,
+        max_age=max_age,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = immutable
+    return response
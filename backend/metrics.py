@@ -0,0 +1,345 @@
+import atexit
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import partial
+
+from flask import Blueprint, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+# name -> (type, help); histogram buckets come from the METRICS_*_BUCKETS settings
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled, by route, method and status.'),
+    'http_request_duration_seconds': ('histogram', 'Time from before_request to after_request, by route.'),
+    'http_response_size_bytes': ('histogram', 'Response body size as sent, by route.'),
+    'db_queries_total': ('counter', 'SQL statements executed while handling requests, by route.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent executing SQL statements, by route.'),
+    'db_queries_per_request': ('histogram', 'SQL statements executed by one request, by route.'),
+}
+
+_BUCKET_SETTINGS = {
+    'http_request_duration_seconds': 'METRICS_LATENCY_BUCKETS',
+    'http_response_size_bytes': 'METRICS_SIZE_BUCKETS',
+    'db_queries_per_request': 'METRICS_QUERY_BUCKETS',
+}
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+class _Shard:
+    # Counters of one thread; only that thread writes to it, so no lock is needed
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.counters = {}
+        self.histograms = {}
+
+    def add(self, other):
+        for key, value in other.counters.copy().items():  # Copies are atomic, iteration is not
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, histogram in other.histograms.copy().items():
+            merged = self.histograms.setdefault(key, [0] * len(histogram))
+            for index, value in enumerate(histogram.copy()):
+                merged[index] += value
+
+
+class Registry:
+    """
+    Counters and histograms aggregated from per-thread shards.
+
+    Recording only touches the calling thread's shard. Shards are summed
+    when metrics are read. Shards of finished threads are folded into one
+    retired shard, so servers starting a thread per request neither grow
+    the list nor lose totals.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._sweep_at = 64
+        self._lock = threading.Lock()  # Taken when a thread creates its shard and when reading
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                if len(self._shards) >= self._sweep_at:
+                    self._sweep()
+        return shard
+
+    def _sweep(self):
+        # Called with the lock held; a finished thread never writes to its shard again
+        live = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                live.append(shard)
+            else:
+                self._retired.add(shard)
+        self._shards = live
+        self._sweep_at = max(64, 2 * len(live))
+
+    def inc(self, name, labels, amount=1):
+        """Add ``amount`` to a counter; ``labels`` is a tuple of ``(name, value)`` pairs."""
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets):
+        """Record ``value`` in a histogram with the given upper bounds."""
+        histograms = self._shard().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(buckets) + 1) + [0.0]  # Per-bucket counts, +Inf, sum
+        histogram[bisect_left(buckets, value)] += 1
+        histogram[-1] += value
+
+    def snapshot(self):
+        """
+        Sum every shard.
+
+        Returns:
+            dict: ``{'counters': {key: value}, 'histograms': {key: [counts..., sum]}}``.
+        """
+        total = _Shard()
+        with self._lock:
+            self._sweep()
+            total.add(self._retired)
+            for shard in self._shards:
+                total.add(shard)
+        return {'counters': total.counters, 'histograms': total.histograms}
+
+
+registry = Registry()
+
+
+def merge_snapshots(snapshots):
+    """Sum several ``Registry.snapshot()`` results."""
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for key, value in snapshot['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, histogram in snapshot['histograms'].items():
+            merged = histograms.setdefault(key, [0] * len(histogram))
+            for index, value in enumerate(histogram):
+                merged[index] += value
+    return {'counters': counters, 'histograms': histograms}
+
+
+def _dump(snapshot):
+    return json.dumps({
+        kind: [[name, [list(pair) for pair in labels], value] for (name, labels), value in values.items()]
+        for kind, values in snapshot.items()
+    })
+
+
+def _load(raw):
+    data = json.loads(raw)
+    return {
+        kind: {(name, tuple(tuple(pair) for pair in labels)): value for name, labels, value in values}
+        for kind, values in data.items()
+    }
+
+
+class ProcessFiles:
+    """
+    ``METRICS_MODE='multiprocess'``: share snapshots through ``METRICS_DIR``.
+
+    Every process periodically writes its own snapshot to one file, and a
+    scrape answered by any worker merges all of them. Files of exited
+    processes are kept so totals stay monotonic; clear the directory on
+    deploy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+        self._flushed = 0.0
+
+    def _own_path(self, directory):
+        if self._pid != os.getpid():  # First use, or a forked child
+            self._pid = os.getpid()
+            self._path = os.path.join(directory, f'metrics-{self._pid}-{time.time_ns()}.json')
+        return self._path
+
+    def flush(self, directory, interval=0):
+        """Write this process's snapshot if the last write is older than ``interval`` seconds."""
+        if time.monotonic() - self._flushed < interval or not self._lock.acquire(blocking=False):
+            return
+        try:
+            path = self._own_path(directory)
+            os.makedirs(directory, exist_ok=True)
+            with open(path + '.tmp', 'w') as out:
+                out.write(_dump(registry.snapshot()))
+            os.replace(path + '.tmp', path)  # Readers never see a partial file
+            self._flushed = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def collect(self, directory):
+        """Merge the snapshots of every process, this one up to date."""
+        self.flush(directory)
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(_load(f.read()))
+            except (OSError, ValueError):
+                continue  # Being replaced, or truncated by a crash
+        return merge_snapshots(snapshots)
+
+
+process_files = ProcessFiles()
+
+
+def _route():
+    # The rule template keeps label cardinality bounded (/api/products/<int:item_id>)
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_db_time = 0.0
+
+
+def _record_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    labels = (_route(), request.method, str(response.status_code))
+    if response.is_streamed:
+        # A streamed body runs its queries while it is sent; record the request once it is closed
+        response.call_on_close(partial(_observe_request, current_app.config, labels, start, g._get_current_object(), None))
+    else:
+        _observe_request(current_app.config, labels, start, g._get_current_object(), response.content_length)
+    return response
+
+
+def _observe_request(config, labels, start, state, size):
+    # state is the request's g, still updated by the cursor listeners while a body streams
+    route, method, status = labels
+    route = (('route', route),)
+    queries = state.pop('metrics_queries', 0)
+    registry.inc('http_requests_total', route + (('method', method), ('status', status)))
+    registry.observe('http_request_duration_seconds', route, time.perf_counter() - start, config['METRICS_LATENCY_BUCKETS'])
+    if size is not None:
+        registry.observe('http_response_size_bytes', route, size, config['METRICS_SIZE_BUCKETS'])
+    registry.inc('db_queries_total', route, queries)
+    registry.inc('db_query_duration_seconds_total', route, state.pop('metrics_db_time', 0.0))
+    registry.observe('db_queries_per_request', route, queries, config['METRICS_QUERY_BUCKETS'])
+
+    if config['METRICS_MODE'] == 'multiprocess':
+        process_files.flush(config['METRICS_DIR'], config['METRICS_FLUSH_INTERVAL'])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['metrics_query_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop('metrics_query_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if has_request_context() and 'metrics_queries' in g:
+        g.metrics_queries += 1
+        g.metrics_db_time += elapsed
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot, config):
+    """
+    Format a snapshot in the Prometheus text exposition format (0.0.4).
+
+    Args:
+        snapshot (dict): ``Registry.snapshot()`` or merged snapshots.
+        config (Config): Application config holding the bucket settings.
+
+    Returns:
+        str: The exposition, one ``# HELP`` / ``# TYPE`` block per metric.
+    """
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if kind == 'counter':
+            for (metric, labels), value in sorted(snapshot['counters'].items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+            continue
+        bounds = [_number(bound) for bound in config[_BUCKET_SETTINGS[name]]] + ['+Inf']
+        for (metric, labels), histogram in sorted(snapshot['histograms'].items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(bounds, histogram[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(histogram[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+@metrics_bp.route('/api/metrics')
+def metrics():
+    """Request and SQL metrics in Prometheus text format."""
+    config = current_app.config
+    token = config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return {'error': 'Invalid metrics token'}, 401
+
+    if config['METRICS_MODE'] == 'multiprocess':
+        snapshot = process_files.collect(config['METRICS_DIR'])
+    else:
+        snapshot = registry.snapshot()
+    return Response(render_prometheus(snapshot, config), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app):
+    """
+    Instrument ``app``: request timing, status and size, SQL counts and time.
+
+    SQL statements are counted with cursor-execute listeners on every engine
+    of the app and attributed to the request running on that thread.
+    """
+    mode = app.config['METRICS_MODE']
+    if mode == 'off':
+        return
+    if mode not in ('process', 'multiprocess'):
+        raise ValueError(f'Unknown METRICS_MODE: {mode}')
+
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.register_blueprint(metrics_bp)
+
+    if mode == 'multiprocess':
+        directory = app.config['METRICS_DIR']
+        atexit.register(process_files.flush, directory)
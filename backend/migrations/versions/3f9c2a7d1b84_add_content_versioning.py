@@ -0,0 +1,55 @@
+"""Add content versioning
+
+Revision ID: 3f9c2a7d1b84
+Revises: 7e701cbd6cd5
+Create Date: 2026-10-17 09:12:44.381920
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b84'
+down_revision = '7e701cbd6cd5'
+branch_labels = None
+depends_on = None
+
+CONTENT_TABLES = (
+    'about_us', 'aggression_processes', 'announcements', 'farm_progressions',
+    'how_tos', 'milling_processes', 'nursery', 'products',
+)
+
+
+def upgrade():
+    table_versions = op.create_table('table_versions',
+    sa.Column('table_name', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+
+    for table in CONTENT_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # SQLite cannot add a column with a non-constant default, so backfill first
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+    now = datetime.utcnow()
+    op.bulk_insert(table_versions, [
+        {'table_name': table, 'version': 1, 'updated_at': now} for table in CONTENT_TABLES
+    ])
+
+
+def downgrade():
+    for table in reversed(CONTENT_TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('version')
+
+    op.drop_table('table_versions')
@@ -1,8 +1,48 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password
+from routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # Public GETs may read from a replica bind
+
+
+class VersionedMixin:
+    """
+    Adds per-row change tracking to content models.
+
+    ``version`` is bumped and ``updated_at`` refreshed on every update by the
+    session hooks in ``versioning.py``; they also bump the per-table counter
+    in ``TableVersion`` so list endpoints can be revalidated cheaply.
+    """
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Per-table version counter used for conditional GETs on list endpoints
+class TableVersion(db.Model):
+    """Latest version and modification time of a content table."""
+    __tablename__ = 'table_versions'
+    table_name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TableVersion {self.table_name} v{self.version}>"
+
+# Append-only log of content writes, read by /api/changes
+class Change(db.Model):
+    """One insert, update or delete of a content row; ``seq`` orders them for delta sync."""
+    __tablename__ = 'changes'
+    __table_args__ = {'sqlite_autoincrement': True}  # seq is never reused, even after `flask changes prune`
+    seq = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(100), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # insert, update or delete (tombstone)
+    version = db.Column(db.Integer, nullable=True)  # Row version written, None for deletes
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # The row's updated_at, or deletion time
+
+    def __repr__(self):
+        return f"<Change {self.seq} {self.op} {self.table_name}/{self.row_id}>"
 
 # User Model
 class User(db.Model):
@@ -10,18 +50,18 @@ class User(db.Model):
     username = db.Column(db.String(100), unique=True, nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
-    is_admin = db.Column(db.Boolean, default=True)
+    is_admin = db.Column(db.Boolean, default=True, index=True)  # admin_exists()
 
     def __repr__(self):
         return f"<User {self.username}>"
 
     def set_password(self, password):
         """Hash and set the user's password."""
-        self.password = generate_password_hash(password)
+        self.password = hash_password(password)
 
     def check_password(self, password):
         """Check if the provided password matches the stored hash."""
-        return check_password_hash(self.password, password)
+        return verify_password(self.password, password)
 
     @staticmethod
     def admin_exists():
@@ -31,33 +71,78 @@ class User(db.Model):
         return db.session.query(User.id).filter_by(is_admin=True).first() is not None
 
 
+# Media model for content-addressed uploads (see storage.py)
+class Media(db.Model):
+    """An uploaded file stored once under its SHA-256, shared by every row using it."""
+    __tablename__ = 'media'
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    path = db.Column(db.String(200), unique=True, nullable=False)  # Relative to UPLOAD_FOLDER, e.g. ab/cd/<sha256>.jpg
+    content_type = db.Column(db.String(100), nullable=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Media {self.path} refs={self.ref_count}>"
+
+
+# Background job queue (see jobs.py)
+class Job(db.Model):
+    """A unit of deferred work, claimed by `flask jobs worker` under a lease."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_claim', 'status', 'priority', 'run_at'),
+        db.Index('ix_jobs_finished', 'status', 'finished_at'),  # `flask jobs purge`
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)  # Name registered with @task
+    args = db.Column(db.JSON, nullable=False, default=list)
+    kwargs = db.Column(db.JSON, nullable=False, default=dict)
+    priority = db.Column(db.Integer, nullable=False, default=0)  # Higher runs first
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not claimed before this (retry backoff)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)  # Lease; an expired running job is claimed again
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.task} {self.status}>"
+
+
 # Nursery model for Admin and Guest resources
-class Nursery(db.Model):
+class Nursery(VersionedMixin, db.Model):
     """Nursery model representing a nursery."""
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.String(500), nullable=True)
     photo_path = db.Column(db.String(200), nullable=True)
+    photo_variants = db.Column(db.JSON, nullable=True, info={'srcset': True})  # Rendered by images.py
 
     def __repr__(self):
         return f"<Nursery {self.name}>"
 
     
 # Product model for Admin and Guest resources
-class Product(db.Model):
+class Product(VersionedMixin, db.Model):
     """Product model representing a product in the system."""
     __tablename__ = 'products'
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.String(500), nullable=True)
     image_path = db.Column(db.String(200), nullable=True)
+    image_variants = db.Column(db.JSON, nullable=True, info={'srcset': True})  # Rendered by images.py
 
     def __repr__(self):
         return f"<Product {self.name}>"
 
 
 # AboutUs model for Admin and Guest resources
-class AboutUs(db.Model):
+class AboutUs(VersionedMixin, db.Model):
     """AboutUs model providing details about the organization."""
     __tablename__ = 'about_us'
     id = db.Column(db.Integer, primary_key=True)
@@ -74,11 +159,11 @@ class AboutUs(db.Model):
 
 
 # MillingProcess model (Admin & Guest Resources)
-class MillingProcess(db.Model):
+class MillingProcess(VersionedMixin, db.Model):
     """Milling process model representing various milling processes."""
     __tablename__ = 'milling_processes'
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.String(500), nullable=True)
     video_link = db.Column(db.String(200), nullable=True)  # Changed from video_path to video_link
 
@@ -87,11 +172,11 @@ class MillingProcess(db.Model):
 
 
 # AggressionProcess model (Admin & Guest Resources)
-class AggressionProcess(db.Model):
+class AggressionProcess(VersionedMixin, db.Model):
     """Aggression process model representing various aggression processes."""
     __tablename__ = 'aggression_processes'
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.String(500), nullable=True)
     video_link = db.Column(db.String(200), nullable=True)  # Changed from video_path to video_link
 
@@ -100,24 +185,25 @@ class AggressionProcess(db.Model):
 
 
 # FarmProgression model (Admin & Guest Resources)
-class FarmProgression(db.Model):
+class FarmProgression(VersionedMixin, db.Model):
     """Farm progression model representing various farm progressions."""
     __tablename__ = 'farm_progressions'
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.String(500), nullable=True)
     photo_path = db.Column(db.String(200), nullable=True)
+    photo_variants = db.Column(db.JSON, nullable=True, info={'srcset': True})  # Rendered by images.py
 
     def __repr__(self):
         return f"<FarmProgression {self.name}>"
 
 
 # HowTo model (Admin & Guest Resources)
-class HowTo(db.Model):
+class HowTo(VersionedMixin, db.Model):
     """HowTo model for providing instructional content."""
     __tablename__ = 'how_tos'
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(100), nullable=False)
+    title = db.Column(db.String(100), nullable=False, index=True)
     content = db.Column(db.Text, nullable=True)
     video_link = db.Column(db.String(200), nullable=True)  # Changed to video_link
 
@@ -126,11 +212,11 @@ class HowTo(db.Model):
 
 
 # Announcement model (Admin & Guest Resources)
-class Announcement(db.Model):
+class Announcement(VersionedMixin, db.Model):
     """Announcement model for storing organizational announcements."""
     __tablename__ = 'announcements'
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(100), nullable=False)
+    title = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
 
     def __repr__(self):
@@ -0,0 +1,163 @@
+from urllib.parse import urlencode
+
+from flask import Response, current_app, request, stream_with_context
+
+from fieldsets import FieldsetError, make_serializer, project, requested_fields
+from fragments import json_encoder, list_response, version_keys
+from models import db
+
+
+class PaginationError(ValueError):
+    """Raised when the pagination query parameters are invalid."""
+
+
+def parse_int(name, minimum):
+    """
+    Read an optional integer query parameter.
+
+    Returns:
+        int: ``None`` when the parameter is absent or empty.
+
+    Raises:
+        PaginationError: If the value is not an integer or is below ``minimum``.
+    """
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise PaginationError(f"'{name}' must be an integer")
+    if value < minimum:
+        raise PaginationError(f"'{name}' must be at least {minimum}")
+    return value
+
+
+def _wants_stream():
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def keyset_select(model, fields, after=None):
+    """
+    Build the keyset SELECT of a model's fields, ordered by primary key.
+
+    Args:
+        model (db.Model): The model to list.
+        fields (tuple): Columns to select, see ``fieldsets.project``.
+        after (int): Only return rows with an id greater than this cursor.
+
+    Returns:
+        Select: Core statement ordered by ``id``.
+    """
+    return _keyset(project(model, fields), model, after)
+
+
+def _keyset(statement, model, after):
+    id_column = model.__table__.c.id
+    statement = statement.order_by(id_column)
+    if after is not None:
+        statement = statement.where(id_column > after)
+    return statement
+
+
+def next_page_headers(last_id, limit):
+    """
+    Build the response headers pointing at the page after ``last_id``.
+
+    Args:
+        last_id (int): Id of the last row of the current page.
+        limit (int): Page size used for the current page.
+
+    Returns:
+        dict: ``X-Next-Cursor`` and ``Link`` headers.
+    """
+    args = request.args.to_dict()
+    args.update(after=last_id, limit=limit)
+    return {
+        'X-Next-Cursor': str(last_id),
+        'Link': f'<{request.path}?{urlencode(args)}>; rel="next"'
+    }
+
+
+def stream_json(statement, serialize, chunk_size=None):
+    """
+    Stream a statement as a JSON array without materialising the whole result.
+
+    Rows are fetched from a server-side cursor in batches of ``chunk_size``
+    and each batch is written out as one chunk of the array.
+
+    Args:
+        statement (Select): Statement to stream.
+        serialize (callable): Turns one row into a JSON-serialisable dict.
+        chunk_size (int): Rows per fetched batch and per emitted chunk.
+
+    Returns:
+        Response: A streamed ``application/json`` response.
+    """
+    chunk_size = chunk_size or current_app.config['STREAM_CHUNK_SIZE']
+    statement = statement.execution_options(yield_per=chunk_size)
+    encode = json_encoder()
+
+    def generate():
+        yield b'['
+        first = True
+        result = db.session.execute(statement)
+        for partition in result.partitions():
+            chunk = b','.join(encode(serialize(row)) for row in partition)
+            yield chunk if first else b',' + chunk
+            first = False
+        yield b']\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def paginated_list(model, available):
+    """
+    List a model using keyset pagination on ``id``.
+
+    Reads ``?limit=``, ``?after=`` and ``?fields=`` from the request. Pages
+    are only served when ``?limit=`` or ``?after=`` is given; without either
+    the whole table is returned, unpaged, so existing clients see every row.
+    When ``?stream=1`` is given the remaining rows are streamed as a JSON
+    array instead of being returned as a single page.
+
+    Pages are assembled from the per-row JSON fragments of
+    ``fragments.row_fragments``: only the ids and versions of the page are
+    read first, and rows that changed since they were last encoded are
+    loaded and encoded again.
+
+    Args:
+        model (db.Model): The model to list.
+        available (tuple): Every field the resource exposes.
+
+    Returns:
+        tuple or Response: The page, or a 400 error tuple.
+    """
+    try:
+        limit = parse_int('limit', 1)
+        after = parse_int('after', 0)
+        fields = requested_fields(available)
+    except (PaginationError, FieldsetError) as e:
+        return {'error': str(e)}, 400
+
+    if _wants_stream():
+        statement = keyset_select(model, fields, after)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return stream_json(statement, make_serializer(model, fields))
+
+    if limit is None and after is None:
+        # Clients that do not page get the whole table, as before pagination existed
+        keys = db.session.execute(_keyset(version_keys(model), model, None)).all()
+        return list_response(model, fields, keys)
+
+    limit = min(limit or current_app.config['PAGE_DEFAULT_LIMIT'], current_app.config['PAGE_MAX_LIMIT'])
+
+    # Fetch one extra key to learn whether another page exists
+    keys = db.session.execute(_keyset(version_keys(model), model, after).limit(limit + 1)).all()
+    headers = {}
+    if len(keys) > limit:
+        keys = keys[:limit]
+        headers = next_page_headers(keys[-1].id, limit)
+
+    return list_response(model, fields, keys, headers)
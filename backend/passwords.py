@@ -0,0 +1,81 @@
+import threading
+from concurrent import futures
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Key derivation runs in its own small pool: hashlib releases the GIL while
+# deriving, so a login burst occupies these threads (and at most
+# PASSWORD_HASH_QUEUE_SIZE request threads waiting on them), not the whole server
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing queue is full or too slow; callers answer 429."""
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _executor = futures.ThreadPoolExecutor(
+                max_workers=current_app.config['PASSWORD_HASH_WORKERS'], thread_name_prefix='password-hash'
+            )
+            _slots = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_QUEUE_SIZE'])
+    return _executor, _slots
+
+
+def _run(fn, *args):
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy('Too many password checks in progress, try again shortly')
+    # The slot is held until the hash finishes, even if the request gave up waiting
+    future = executor.submit(fn, *args)
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+    except futures.TimeoutError:
+        raise HashingBusy('Password check timed out, try again shortly')
+
+
+def hash_password(password):
+    """
+    Hash a password with the configured ``PASSWORD_HASH_METHOD``.
+
+    Raises:
+        HashingBusy: If the hashing queue is full.
+    """
+    return _run(
+        generate_password_hash, password,
+        current_app.config['PASSWORD_HASH_METHOD'], current_app.config['PASSWORD_SALT_LENGTH']
+    )
+
+
+def verify_password(password_hash, password):
+    """
+    Check a password against a stored hash of any supported method.
+
+    Raises:
+        HashingBusy: If the hashing queue is full.
+    """
+    return _run(check_password_hash, password_hash, password)
+
+
+def _method_parameters(method):
+    # Werkzeug's defaults filled in, so 'pbkdf2:sha256' equals the hash it stores with DEFAULT_PBKDF2_ITERATIONS
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        return (name,) + (tuple(int(arg) for arg in args) if args else (2 ** 15, 8, 1))
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return (name, hash_name, iterations)
+    return (name, *args)
+
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with other parameters than ``PASSWORD_HASH_METHOD``."""
+    stored = password_hash.split('$', 1)[0]
+    return _method_parameters(stored) != _method_parameters(current_app.config['PASSWORD_HASH_METHOD'])
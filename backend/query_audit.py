@@ -0,0 +1,165 @@
+import logging
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class QueryAuditError(RuntimeError):
+    """Raised in ``QUERY_AUDIT_MODE='raise'`` when a request exceeds its budget or runs an N+1 pattern."""
+
+
+def find_n_plus_one(statements, threshold):
+    """
+    Find statements repeated with different parameters: the N+1 pattern.
+
+    Args:
+        statements (list): ``(sql, parameters)`` pairs in execution order.
+        threshold (int): Executions of the same SQL that count as a pattern.
+
+    Returns:
+        list: ``(sql, executions)`` pairs, most repeated first.
+    """
+    executions = {}
+    parameters = {}
+    for sql, params in statements:
+        executions[sql] = executions.get(sql, 0) + 1
+        parameters.setdefault(sql, set()).add(repr(params))
+    found = [
+        (sql, count) for sql, count in executions.items()
+        if count >= threshold and len(parameters[sql]) > 1
+    ]
+    return sorted(found, key=lambda item: -item[1])
+
+
+def query_budget(view_class, method):
+    """
+    The query budget a resource declares for an HTTP method.
+
+    Resources declare ``query_budget`` as an int for every method or as a
+    dict keyed by lower-case method name, e.g. ``{'get': 3, 'post': 6}``.
+
+    Returns:
+        int: ``None`` when the resource declares no budget.
+    """
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(method.lower())
+    return budget
+
+
+def audit(statements, budget, threshold):
+    """
+    Check recorded statements against a budget and for N+1 patterns.
+
+    Returns:
+        list: Human readable problems, empty if the statements are fine.
+    """
+    problems = []
+    if budget is not None and len(statements) > budget:
+        problems.append(f'{len(statements)} queries, budget is {budget}')
+    for sql, count in find_n_plus_one(statements, threshold):
+        problems.append(f'N+1: {count} executions of {" ".join(sql.split())[:200]}')
+    return problems
+
+
+@contextmanager
+def capture_queries():
+    """
+    Record the statements the current thread executes, for tests.
+
+    Yields:
+        list: ``(sql, parameters)`` pairs, filled in as statements run.
+    """
+    recorders = _local.__dict__.setdefault('recorders', [])
+    statements = []
+    recorders.append(statements)
+    try:
+        yield statements
+    finally:
+        recorders.remove(statements)
+
+
+@contextmanager
+def assert_queries(budget=None, threshold=None):
+    """
+    Fail with ``QueryAuditError`` if the block exceeds ``budget`` queries or runs an N+1 pattern.
+
+    Needs an app context; ``threshold`` defaults to ``QUERY_AUDIT_N_PLUS_ONE``.
+    """
+    threshold = threshold or current_app.config['QUERY_AUDIT_N_PLUS_ONE']
+    with capture_queries() as statements:
+        yield statements
+    problems = audit(statements, budget, threshold)
+    if problems:
+        raise QueryAuditError('; '.join(problems))
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    entry = (statement, parameters)
+    for recorder in getattr(_local, 'recorders', ()):
+        recorder.append(entry)
+    if has_request_context() and 'query_log' in g:
+        g.query_log.append(entry)
+
+
+def _start_request():
+    g.query_log = []
+
+
+def _audit_request(config, label, budget, state):
+    # state is the request's g, still filled by _record_statement while a body streams
+    statements = state.pop('query_log', [])
+    problems = audit(statements, budget, config['QUERY_AUDIT_N_PLUS_ONE'])
+    if problems:
+        message = f'{label}: ' + '; '.join(problems)
+        if config['QUERY_AUDIT_MODE'] == 'raise':
+            raise QueryAuditError(message)
+        logger.warning('Query audit: %s', message)
+    return statements, problems
+
+
+def _check_request(response):
+    if 'query_log' not in g:
+        return response
+    view_class = getattr(current_app.view_functions.get(request.endpoint), 'view_class', None)
+    audit_args = (current_app.config, f'{request.method} {request.path}', query_budget(view_class, request.method))
+    if response.is_streamed:
+        # The headers are sent before the body runs its queries: audit it once closed, without them
+        response.call_on_close(partial(_audit_request, *audit_args, g._get_current_object()))
+        return response
+
+    statements, problems = _audit_request(*audit_args, g._get_current_object())
+    response.headers['X-Query-Count'] = str(len(statements))
+    if problems:
+        response.headers['X-Query-Audit'] = '; '.join(problems)[:1000]
+    return response
+
+
+def init_query_audit(app):
+    """
+    Record every statement of each request when ``QUERY_AUDIT_MODE`` is set.
+
+    ``warn`` logs budget overruns and N+1 patterns and reports them in
+    ``X-Query-Audit``; ``raise`` fails the request with ``QueryAuditError``,
+    which fails the test that sent it. Meant for tests and staging: every
+    statement and its parameters are kept until the request ends.
+    """
+    mode = app.config['QUERY_AUDIT_MODE']
+    if mode not in ('off', 'warn', 'raise'):
+        raise ValueError(f'Unknown QUERY_AUDIT_MODE: {mode}')
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _record_statement)  # Also feeds capture_queries()
+    if mode != 'off':
+        app.before_request(_start_request)
+        app.after_request(_check_request)
@@ -0,0 +1,330 @@
+import io
+import os
+import re
+import tempfile
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+
+from models import db, User
+from query_audit import QueryAuditError, assert_queries, capture_queries, query_budget
+
+_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def sample_requests(app):
+    """
+    Requests exercising every GET route of the API, plus the login lookup.
+
+    Item routes get the smallest existing id of their table, so the plans
+    are those of real lookups.
+
+    Returns:
+        list: ``(method, url, json_body)`` tuples.
+    """
+    requests = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        view_class = getattr(app.view_functions.get(rule.endpoint), 'view_class', None)
+        if view_class is None or 'GET' not in rule.methods or not rule.rule.startswith('/api/'):
+            continue
+        if not rule.arguments:
+            requests.append(('GET', rule.rule, None))
+            if hasattr(view_class, 'spec'):  # CRUD lists: first page, next page and a fieldset
+                requests.append(('GET', f'{rule.rule}?after=1&limit=5', None))
+                requests.append(('GET', f"{rule.rule}?fields={view_class.spec.fields[1]}", None))
+            continue
+        model = getattr(getattr(view_class, 'spec', None), 'model', None)
+        row_id = db.session.execute(select(db.func.min(model.id))).scalar() if model is not None else None
+        url = rule.build({name: row_id or 1 for name in rule.arguments}, append_unknown=False)[1]
+        requests.append(('GET', url, None))
+    requests.append(('GET', '/api/search?q=coffee', None))
+    requests.append(('GET', '/api/changes?since=1', None))
+    requests.append(('POST', '/api/login', {'email': 'audit-plans@example.invalid', 'password': 'x'}))
+    return requests
+
+
+def full_scans(statement, plan, tables):
+    """
+    Problems in one ``EXPLAIN QUERY PLAN`` result.
+
+    A ``SCAN`` of a table is a full scan unless the statement is a bare
+    ``LIMIT`` read (first page, About Us) with no filter or sort to satisfy.
+    Sorting full-text matches by rank is expected: only the matches are sorted.
+
+    Args:
+        statement (str): The SQL that was explained.
+        plan (list): The ``detail`` column of each plan row.
+        tables (set): Names of real tables (FTS virtual tables are not scans).
+
+    Returns:
+        list: Human readable problems, empty if the plan is fine.
+    """
+    problems = []
+    sql = ' '.join(statement.split()).upper()
+    sorted_in_memory = any('USE TEMP B-TREE' in detail for detail in plan)
+    bounded = ' LIMIT ' in sql and ' WHERE ' not in sql and not sorted_in_memory
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if match and match.group(1) in tables and not bounded:
+            problems.append(f'full scan: {detail}')
+        elif 'USE TEMP B-TREE' in detail and ' MATCH ' not in sql:
+            problems.append(f'sort without index: {detail}')
+    return sorted(set(problems))
+
+
+@click.command('audit-plans')
+@click.option('--verbose', '-v', is_flag=True, help='Print the plan of every statement, not only flagged ones.')
+@with_appcontext
+def audit_plans_command(verbose):
+    """Run EXPLAIN QUERY PLAN for every query the resources issue and flag full scans."""
+    from flask_jwt_extended import create_access_token
+
+    from app import create_app
+    from auth import admin_claims
+    from config import Config
+
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('audit-plans uses EXPLAIN QUERY PLAN and needs the SQLite database')
+
+    # Same database, with every cache off so each handler runs its queries
+    config = type('AuditConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': current_app.config['SQLALCHEMY_DATABASE_URI'], 'SQLALCHEMY_BINDS': {},
+        'RESPONSE_CACHE_BACKEND': 'null', 'ROW_CACHE_SIZE': 0, 'METRICS_MODE': 'off',
+        'QUERY_AUDIT_MODE': 'off', 'API_DOCS_MODE': 'off',
+    })
+    api_app = create_app(config, role='api')
+    client = api_app.test_client()
+
+    statements = {}
+    with api_app.app_context():
+        admin = db.session.execute(select(User).where(User.is_admin.is_(True)).limit(1)).scalar()
+        token = create_access_token(identity=str(admin.id), additional_claims=admin_claims(admin)) if admin else None
+        samples = sample_requests(api_app)
+
+    headers = {'Authorization': f'Bearer {token}'} if token else {}  # Admin routes too, when an admin exists
+    for method, url, body in samples:
+        with capture_queries() as captured:
+            try:
+                status = client.open(url, method=method, json=body, headers=headers).status_code
+            except Exception as e:  # The statements issued before the error are still audited
+                status = type(e).__name__
+                click.echo(f'error  {method} {url}: {e}', err=True)
+        for sql, parameters in captured:
+            statements.setdefault(sql, (parameters, []))[1].append(f'{method} {url} ({status})')
+
+    tables = set(db.metadata.tables)
+    flagged = 0
+    with db.engine.connect() as connection:
+        for sql, (parameters, sources) in statements.items():
+            if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                continue
+            try:
+                plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parameters)]
+            except DBAPIError as e:  # e.g. the FTS tables before `flask search rebuild`
+                click.echo(f"error  {' '.join(sql.split())[:160]}: {e.orig}", err=True)
+                continue
+            problems = full_scans(sql, plan, tables)
+            flagged += bool(problems)
+            if problems or verbose:
+                click.echo(f"{'FLAG' if problems else 'ok'}   {' '.join(sql.split())[:160]}")
+                click.echo(f"       from {', '.join(sorted(set(sources))[:3])}")
+                for detail in plan:
+                    click.echo(f'       | {detail}')
+                for problem in problems:
+                    click.echo(f'       ! {problem}')
+
+    click.echo(f'{len(statements)} statements from {len(samples)} requests, {flagged} flagged')
+    if flagged:
+        raise SystemExit(1)
+
+
+def _sample_png(color):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    buffer.seek(0)
+    return buffer
+
+
+def _sample_item(spec, number):
+    # Paths are set by uploads, not by clients
+    return {field: None if field.endswith('_path') else f'audit {field} {number}' for field in spec.writable}
+
+
+def write_requests(app, items=50):
+    """
+    Requests exercising every write route of the API, on an empty database.
+
+    Registers and logs in the admin, then creates, updates, bulk-writes and
+    deletes rows of each CRUD resource and writes About Us. Resources whose
+    ``post`` documents a file parameter are sent a PNG upload. Ids are those a fresh
+    database assigns: created rows get ids 1, 2, ... in order.
+
+    Returns:
+        list: ``(method, url, kwargs)`` tuples, ``kwargs`` for the test client.
+    """
+    from resources import ABOUT_US_FIELDS
+
+    requests = [
+        ('POST', '/api/register', {'json': {'username': 'audit', 'email': 'audit@example.invalid', 'password': 'audit'}}),
+        ('POST', '/api/login', {'json': {'email': 'audit@example.invalid', 'password': 'audit'}}),
+        ('GET', '/api/user/1', {}),
+    ]
+    about_us = [{field: f'audit {field} {number}' for field in ABOUT_US_FIELDS if field != 'id'} for number in range(2)]
+    requests += [('POST', '/api/about-us', {'json': about_us[0]}), ('PUT', '/api/about-us', {'json': about_us[1]})]
+
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        view_class = getattr(app.view_functions.get(rule.endpoint), 'view_class', None)
+        spec = getattr(view_class, 'spec', None)
+        if spec is None or rule.arguments:
+            continue
+        if rule.rule.endswith('/bulk'):
+            bulk = [_sample_item(spec, number) for number in range(items)]
+            requests += [
+                ('POST', rule.rule, {'json': bulk}),
+                ('PUT', rule.rule, {'json': [dict(item, id=number) for number, item in enumerate(bulk, start=2)]}),
+                ('DELETE', rule.rule, {'json': {'ids': list(range(2, items + 2))}}),
+            ]
+            continue
+        item = _sample_item(spec, 0)
+        files = [
+            parameter['name'] for parameter in getattr(view_class.post, 'specs_dict', {}).get('parameters', ())
+            if parameter.get('type') == 'file'
+        ]
+        if files:  # Created from a form with an upload
+            form = {field: value for field, value in item.items() if value is not None}
+            requests += [
+                ('POST', rule.rule, {'data': dict(form, **{files[0]: (_sample_png('red'), 'audit.png')})}),
+                ('PUT', f'{rule.rule}/1', {'data': dict(form, **{files[0]: (_sample_png('blue'), 'audit.png')})}),
+            ]
+        else:
+            requests.append(('POST', rule.rule, {'json': item}))
+        requests.append(('PUT', f'{rule.rule}/1', {'json': _sample_item(spec, 1)}))
+    return requests
+
+
+def delete_requests(app):
+    """Requests deleting the rows ``write_requests`` left: item 1 of each CRUD resource and About Us."""
+    requests = [('DELETE', '/api/about-us', {})]
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        view_class = getattr(app.view_functions.get(rule.endpoint), 'view_class', None)
+        if hasattr(view_class, 'spec') and not rule.arguments and not rule.rule.endswith('/bulk'):
+            requests.append(('DELETE', f'{rule.rule}/1', {}))
+    return requests
+
+
+def _audited_routes(app):
+    # (view class, method) pairs that declare a query budget
+    routes = set()
+    for rule in app.url_map.iter_rules():
+        view_class = getattr(app.view_functions.get(rule.endpoint), 'view_class', None)
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            if query_budget(view_class, method) is not None:
+                routes.add((view_class.__name__, method))
+    return routes
+
+
+def check_budgets(app, items=50):
+    """
+    Replay every audited route of ``app`` under ``assert_queries``.
+
+    Runs ``write_requests``, then ``sample_requests`` while every table has
+    rows, then ``delete_requests``, as the admin, with its cached status
+    dropped before each request. ``app`` must serve the API on an empty
+    database with its tables and search index created, and every cache off
+    so each request runs all of its queries. No app context may be active:
+    each request pushes its own, as in production.
+
+    Args:
+        app (Flask): The app to replay against.
+        items (int): Items per bulk request.
+
+    Yields:
+        tuple: ``(label, statements, budget, problem)`` per request, ``problem``
+        None when it passed; then one entry per audited route never exercised.
+    """
+    from auth import forget_user
+
+    client = app.test_client()
+    urls = app.url_map.bind('')
+    threshold = app.config['QUERY_AUDIT_N_PLUS_ONE']
+    headers = {}
+    exercised = set()
+    for phase in ('write', 'read', 'delete'):
+        with app.app_context():
+            if phase == 'write':
+                samples = write_requests(app, items)
+            elif phase == 'read':
+                samples = [(method, url, {'json': body}) for method, url, body in sample_requests(app)]
+            else:
+                samples = delete_requests(app)
+
+        for method, url, kwargs in samples:
+            view_class = app.view_functions[urls.match(url.split('?')[0], method)[0]].view_class
+            budget = query_budget(view_class, method)
+            exercised.add((view_class.__name__, method))
+            forget_user(1)  # Admin requests pay the status lookup
+            status, problem = None, None
+            try:
+                with assert_queries(budget, threshold) as statements:
+                    response = client.open(url, method=method, headers=headers, **kwargs)
+                    response.get_data()  # Streamed bodies run their queries here
+                    response.close()
+                status = response.status_code
+                if status >= 500:
+                    problem = f'status {status}'
+            except QueryAuditError as e:
+                status = response.status_code
+                problem = str(e)
+            except Exception as e:
+                problem = f'{type(e).__name__}: {e}'
+            if url == '/api/login' and status == 200:
+                headers = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+            yield f'{method} {url} ({status})', len(statements), budget, problem
+
+    for name, method in sorted(_audited_routes(app) - exercised):
+        yield f'{method} {name}', 0, None, 'never exercised, add it to write_requests'
+
+
+@click.command('audit-budgets')
+@click.option('--items', default=50, help='Items per bulk request.')
+@click.option('--verbose', '-v', is_flag=True, help='Print every request, not only failing ones.')
+@with_appcontext
+def audit_budgets_command(items, verbose):
+    """Run every audited endpoint on a scratch database and check it stays within its query_budget."""
+    from app import create_app
+    from config import Config
+    from search import rebuild_search_index
+
+    failures = 0
+    for executor in ('sync', 'jobs'):  # Variants rendered in the request, or enqueued by it
+        with tempfile.TemporaryDirectory() as scratch:
+            # Every cache off, so each request runs all of its queries
+            config = type('AuditConfig', (Config,), {
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(scratch, 'audit.db')}", 'SQLALCHEMY_BINDS': {},
+                'UPLOAD_FOLDER': os.path.join(scratch, 'uploads'), 'IMAGE_EXECUTOR': executor,
+                'RESPONSE_CACHE_BACKEND': 'null', 'ROW_CACHE_SIZE': 0, 'METRICS_MODE': 'off',
+                'QUERY_AUDIT_MODE': 'off', 'API_DOCS_MODE': 'off',
+            })
+            api_app = create_app(config, role='api')
+            with api_app.app_context():
+                db.create_all()
+                with db.engine.begin() as connection:
+                    rebuild_search_index(connection)
+
+            for label, count, budget, problem in check_budgets(api_app, items):
+                failures += problem is not None
+                if problem or verbose:
+                    click.echo(f"{'FAIL' if problem else 'ok'}   {count:>3}/{budget}  [{executor}] {label}")
+                if problem:
+                    click.echo(f'       ! {problem}')
+            with api_app.app_context():
+                db.engine.dispose()
+
+    click.echo(f'{failures} failure(s)')
+    if failures:
+        raise SystemExit(1)
@@ -1,32 +1,49 @@
 
 from flask import request
 from flask_restful import Resource
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from flasgger import swag_from
-import os
-from functools import wraps
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, create_access_token
 
 from models import db, User, Product, Nursery, AboutUs, MillingProcess, AggressionProcess, FarmProgression, HowTo, Announcement
-
-# Helper function to check if the current user is admin
-def is_admin(fn):
-    """Helper to check if current user is admin."""
-    @wraps(fn)
-    def wrapper(self, *args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return {'message': 'You do not have permission to perform this action'}, 403
-        return fn(self, *args, **kwargs)  # Proceed with the original function if user is admin
-    return wrapper
-
-# Helper function to check allowed image types
-def allowed_photo(filename):
-    return filename.lower().endswith(('png', 'jpg', 'jpeg', 'gif'))
+from apidocs import model_schema, swag_from
+from fieldsets import FieldsetError, make_serializer, project, requested_fields
+from http_cache import conditional
+from crud import bulk_resource, crud_resource
+from storage import UploadError, store_upload
+from response_cache import response_cache
+from fragments import row_fragments
+from bundle import Section, bundle_response
+from changelog import changes_response
+from routing import replica_reads
+from auth import admin_claims, admin_required, user_is_admin
+from passwords import HashingBusy, hash_password, needs_rehash, verify_password
+
+# Fields exposed by each content resource, in response order (see ?fields=)
+PRODUCT_FIELDS = ('id', 'name', 'description', 'image_path', 'image_variants')
+NURSERY_FIELDS = ('id', 'name', 'description', 'photo_path', 'photo_variants')
+PROCESS_FIELDS = ('id', 'name', 'description', 'video_link')
+FARM_PROGRESSION_FIELDS = ('id', 'name', 'description', 'photo_path', 'photo_variants')
+HOW_TO_FIELDS = ('id', 'title', 'content', 'video_link')
+ANNOUNCEMENT_FIELDS = ('id', 'title', 'description')
+ABOUT_US_FIELDS = (
+    'id', 'who_we_are', 'our_story', 'mission_statement', 'vision',
+    'core_values', 'what_we_do', 'why_choose_us'
+)
 
 class Register(Resource):
+    query_budget = 4
+
+    @swag_from({
+        'tags': ['Auth'],
+        'parameters': [{'name': 'body', 'in': 'body', 'required': True, 'schema': {
+            'type': 'object', 'required': ['username', 'email', 'password'],
+            'properties': {'username': {'type': 'string'}, 'email': {'type': 'string'}, 'password': {'type': 'string'}}
+        }}],
+        'responses': {
+            201: {'description': 'Admin registered successfully'},
+            400: {'description': 'Admin already exists or missing fields'},
+            429: {'description': 'Password hashing is saturated, retry shortly'}
+        }
+    })
     def post(self):
         """Register the only admin user (if not already exists)."""
         if User.admin_exists():
@@ -40,7 +57,10 @@ class Register(Resource):
         if not (username and email and password):
             return {'error': 'Missing fields'}, 400
 
-        hashed_pw = generate_password_hash(password)
+        try:
+            hashed_pw = hash_password(password)
+        except HashingBusy as e:
+            return {'error': str(e)}, 429, {'Retry-After': '1'}
 
         new_user = User(
             username=username,
@@ -55,6 +75,20 @@ class Register(Resource):
         return {'message': 'Admin registered successfully'}, 201
 
 class Login(Resource):
+    query_budget = 2  # The user, and the hash upgrade when parameters changed
+
+    @swag_from({
+        'tags': ['Auth'],
+        'parameters': [{'name': 'body', 'in': 'body', 'required': True, 'schema': {
+            'type': 'object', 'required': ['email', 'password'],
+            'properties': {'email': {'type': 'string'}, 'password': {'type': 'string'}}
+        }}],
+        'responses': {
+            200: {'description': 'Access token and user details'},
+            401: {'description': 'Invalid email or password'},
+            429: {'description': 'Password hashing is saturated, retry shortly'}
+        }
+    })
     def post(self):
         """Authenticate user and return JWT token."""
         data = request.get_json()
@@ -62,10 +96,21 @@ class Login(Resource):
         password = data.get('password')
 
         user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password, password):
-            return {'error': 'Invalid email or password'}, 401
-
-        access_token = create_access_token(identity=user.id)
+        try:
+            if not user or not verify_password(user.password, password):
+                return {'error': 'Invalid email or password'}, 401
+        except HashingBusy as e:
+            return {'error': str(e)}, 429, {'Retry-After': '1'}
+
+        if needs_rehash(user.password):
+            # Upgrade the stored hash to the current parameters while we know the password
+            try:
+                user.password = hash_password(password)
+                db.session.commit()
+            except HashingBusy:
+                pass  # Try again on a later login
+
+        access_token = create_access_token(identity=str(user.id), additional_claims=admin_claims(user))
         return {
             'access_token': access_token,
             'user': {
@@ -77,11 +122,16 @@ class Login(Resource):
         }, 200
 
 class UserResource(Resource):
+    query_budget = 2  # The user, and the admin status lookup when reading someone else
+
     @jwt_required()
-    def get(self):
-        """Return info about the currently logged-in user."""
-        user_id = get_jwt_identity()
-        user = User.query.get_or_404(user_id)
+    def get(self, user_id):
+        """Return a user's details: your own, or any user's for admins."""
+        identity = get_jwt_identity()
+        if str(user_id) != identity and not (get_jwt().get('is_admin') and user_is_admin(identity)):
+            return {'message': 'You do not have permission to perform this action'}, 403
+
+        user = db.get_or_404(User, user_id)
         return {
             'id': user.id,
             'username': user.username,
@@ -90,76 +140,37 @@ class UserResource(Resource):
         }, 200
 
 
-class ProductResource(Resource):
-    @jwt_required(optional=True)
-    def get(self, product_id=None):
-        """Guests and Admins can view a specific product or list all products."""
-        if product_id:
-            # Fetch a specific product by product_id
-            product = Product.query.get_or_404(product_id)
-            product_data = {
-                'id': product.id,
-                'name': product.name,
-                'description': product.description,
-                'image_path': product.image_path
-            }
-            return product_data, 200
-        else:
-            # Fetch all products
-            products = Product.query.all()
-            return [
-                {
-                    'id': product.id,
-                    'name': product.name,
-                    'description': product.description,
-                    'image_path': product.image_path
-                } for product in products
-            ], 200
+ProductResource = crud_resource(Product, PRODUCT_FIELDS, 'Product', required=('name',), read_only=('image_variants',))
+MillingProcessResource = crud_resource(MillingProcess, PROCESS_FIELDS, 'Milling process', required=('name',))
+AggressionProcessResource = crud_resource(AggressionProcess, PROCESS_FIELDS, 'Aggression process', required=('name',))
+FarmProgressionResource = crud_resource(
+    FarmProgression, FARM_PROGRESSION_FIELDS, 'Farm progression', required=('name',), read_only=('photo_variants',)
+)
+HowToResource = crud_resource(HowTo, HOW_TO_FIELDS, 'How To guide', required=('title',))
+AnnouncementResource = crud_resource(Announcement, ANNOUNCEMENT_FIELDS, 'Announcement', required=('title',))
 
-    @jwt_required()
-    def put(self, product_id):
-        """Admin-only: Update a product."""
-        if not is_admin():
-            return {'error': 'Admin access required'}, 403
 
-        product = Product.query.get_or_404(product_id)
-        data = request.get_json()
-        product.name = data.get('name', product.name)
-        product.description = data.get('description', product.description)
-        product.image_path = data.get('image_path', product.image_path)
-        db.session.commit()
-        return {'message': 'Product updated'}, 200
-
-    @jwt_required()
-    def delete(self, product_id):
-        """Admin-only: Delete a product."""
-        if not is_admin():
-            return {'error': 'Admin access required'}, 403
-
-        product = Product.query.get_or_404(product_id)
-        db.session.delete(product)
-        db.session.commit()
-        return {'message': 'Product deleted'}, 200
+class NurseryResource(crud_resource(Nursery, NURSERY_FIELDS, 'Nursery', required=('name',), read_only=('photo_variants',))):
+    # Uploads add the media lookup, its row in a savepoint, the reference counts and
+    # the variants job; IMAGE_EXECUTOR='sync' writes the variants within the request instead
+    query_budget = {'get': 3, 'post': 15, 'put': 15, 'delete': 6}
 
-
-
-class NurseryResource(Resource):
     @swag_from({
         'tags': ['Nursery'],
         'summary': 'Create nursery',
         'description': 'Create a new nursery with name, description, and an image.',
         'parameters': [
             {
-                'name': 'body',
-                'in': 'body',
-                'required': True,
-                'schema': {
-                    'properties': {
-                        'name': {'type': 'string'},
-                        'description': {'type': 'string'}
-                    },
-                    'required': ['name', 'description']
-                }
+                'name': 'name',
+                'in': 'formData',
+                'type': 'string',
+                'required': True
+            },
+            {
+                'name': 'description',
+                'in': 'formData',
+                'type': 'string',
+                'required': False
             },
             {
                 'name': 'image',
@@ -174,88 +185,94 @@ class NurseryResource(Resource):
             400: {'description': 'Invalid image format'}
         }
     })
-    @jwt_required()
-    @is_admin
+    @admin_required
     def post(self):
         """Create a new nursery."""
-        data = request.get_json()
+        data = request.form if request.files else (request.get_json(silent=True) or {})
         file = request.files.get('image')
+        if not file:
+            return {'message': 'Invalid image format'}, 400
+        if not data.get('name'):
+            return {'error': 'Missing fields: name'}, 400
 
-        if file and allowed_photo(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join('uploads', filename)
-            file.save(file_path)
+        try:
+            photo_path = store_upload(file)
+        except UploadError as e:
+            return {'message': str(e)}, 400
 
-            new_nursery = Nursery(
-                name=data['name'],
-                description=data['description'],
-                photo_path=file_path
-            )
+        new_nursery = Nursery(
+            name=data['name'],
+            description=data.get('description'),
+            photo_path=photo_path
+        )
 
-            db.session.add(new_nursery)
-            db.session.commit()
+        db.session.add(new_nursery)
+        db.session.commit()
 
-            return {'message': 'Nursery created successfully'}, 201
-        return {'message': 'Invalid image format'}, 400
+        return {'message': 'Nursery created successfully', 'id': new_nursery.id}, 201
 
-    @jwt_required()
-    @is_admin
-    def put(self, nursery_id):
+    @admin_required
+    def put(self, item_id):
         """Update an existing nursery."""
-        nursery = Nursery.query.get_or_404(nursery_id)
-        data = request.get_json()
-        nursery.name = data['name']
-        nursery.description = data['description']
+        nursery = db.get_or_404(Nursery, item_id)
+        data = request.form if request.files else (request.get_json(silent=True) or {})
 
+        # Store the upload before touching the row: its media lookup and savepoint
+        # would otherwise flush the row once more
         file = request.files.get('image')
-        if file and allowed_photo(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join('uploads', filename)
-            file.save(file_path)
-            nursery.photo_path = file_path
+        if file:
+            try:
+                nursery.photo_path = store_upload(file)
+            except UploadError as e:
+                return {'message': str(e)}, 400
+        nursery.name = data.get('name', nursery.name)
+        nursery.description = data.get('description', nursery.description)
 
         db.session.commit()
         return {'message': 'Nursery updated successfully'}, 200
 
-    @jwt_required()
-    @is_admin
-    def delete(self, nursery_id):
-        """Delete a nursery."""
-        nursery = Nursery.query.get_or_404(nursery_id)
-        db.session.delete(nursery)
-        db.session.commit()
-        return {'message': 'Nursery deleted successfully'}, 200
 
+# Batch endpoints for admin catalog imports (/api/<resource>/bulk)
+ProductBulkResource = bulk_resource(ProductResource)
+NurseryBulkResource = bulk_resource(NurseryResource)
+MillingProcessBulkResource = bulk_resource(MillingProcessResource)
+AggressionProcessBulkResource = bulk_resource(AggressionProcessResource)
+FarmProgressionBulkResource = bulk_resource(FarmProgressionResource)
+HowToBulkResource = bulk_resource(HowToResource)
+AnnouncementBulkResource = bulk_resource(AnnouncementResource)
 
-def is_admin(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        current_user = get_jwt_identity()
-        user = User.query.filter_by(id=current_user).first()
-        if not user or user.role != 'admin':  # Check if the user is an admin
-            return {'message': 'You do not have permission to perform this action'}, 403
-        return fn(*args, **kwargs)
-    return wrapper
 
 class AboutUsResource(Resource):
+    query_budget = {'get': 2, 'post': 6, 'put': 6, 'delete': 6}
+
+    @swag_from({
+        'tags': ['About Us'],
+        'definitions': {'AboutUs': model_schema(AboutUs, ABOUT_US_FIELDS)},
+        'parameters': [{'name': 'fields', 'in': 'query', 'type': 'string',
+                        'description': f"Comma separated subset of: {', '.join(ABOUT_US_FIELDS)}"}],
+        'responses': {
+            200: {'description': 'The About Us details', 'schema': {'$ref': '#/definitions/AboutUs'}},
+            304: {'description': 'Not modified'},
+            404: {'description': 'About Us not found'}
+        }
+    })
+    @replica_reads
+    @response_cache.cached(AboutUs)
+    @conditional(AboutUs)
     def get(self):
         """View the About Us details (everyone can view)."""
-        about_us = AboutUs.query.first()  # Assuming only one record exists
+        try:
+            fields = requested_fields(ABOUT_US_FIELDS)
+        except FieldsetError as e:
+            return {'error': str(e)}, 400
+
+        # Assuming only one record exists
+        about_us = db.session.execute(project(AboutUs, fields).limit(1)).first()
         if about_us:
-            return {
-                'id': about_us.id,
-                'who_we_are': about_us.who_we_are,
-                'our_story': about_us.our_story,
-                'mission_statement': about_us.mission_statement,
-                'vision': about_us.vision,
-                'core_values': about_us.core_values,
-                'what_we_do': about_us.what_we_do,
-                'why_choose_us': about_us.why_choose_us
-            }, 200
+            return make_serializer(AboutUs, fields)(about_us), 200
         return {'message': 'About Us not found'}, 404
 
-    @jwt_required()
-    @is_admin
+    @admin_required
     def post(self):
         """Admin-only: Create a new About Us entry."""
         data = request.get_json()
@@ -275,8 +292,7 @@ class AboutUsResource(Resource):
 
         return {'message': 'About Us details created successfully'}, 201
 
-    @jwt_required()
-    @is_admin
+    @admin_required
     def put(self):
         """Admin-only: Update the About Us details."""
         data = request.get_json()
@@ -297,8 +313,7 @@ class AboutUsResource(Resource):
 
         return {'message': 'About Us details updated successfully'}, 200
 
-    @jwt_required()
-    @is_admin
+    @admin_required
     def delete(self):
         """Admin-only: Delete the About Us entry."""
         about_us = AboutUs.query.first()
@@ -309,280 +324,82 @@ class AboutUsResource(Resource):
         db.session.commit()
 
         return {'message': 'About Us entry deleted successfully'}, 200
-    
-class MillingProcessResource(Resource):
-    @jwt_required(optional=True)
-    def get(self):
-        """View milling processes."""
-        milling_processes = MillingProcess.query.all()
-        result = [
-            {
-                'id': process.id,
-                'name': process.name,
-                'description': process.description,
-                'video_link': process.video_link
-            } for process in milling_processes
-        ]
-        return result, 200
-
-    @jwt_required()
-    @is_admin
-    def post(self):
-        """Admin-only: Add a new milling process."""
-        data = request.get_json()
 
-        new_process = MillingProcess(
-            name=data['name'],
-            description=data.get('description', ''),
-            video_link=data.get('video_link')
-        )
 
-        db.session.add(new_process)
-        db.session.commit()
+# Sections of /api/site-bundle, in response order
+SITE_BUNDLE_SECTIONS = {
+    'about_us': Section(AboutUs, ABOUT_US_FIELDS, many=False),
+    'products': Section(Product, PRODUCT_FIELDS),
+    'nurseries': Section(Nursery, NURSERY_FIELDS),
+    'announcements': Section(Announcement, ANNOUNCEMENT_FIELDS),
+    'how_to': Section(HowTo, HOW_TO_FIELDS),
+}
 
-        return {'message': 'Milling process added successfully'}, 201
 
-    @jwt_required()
-    @is_admin
-    def put(self, process_id):
-        """Admin-only: Update an existing milling process."""
-        data = request.get_json()
-
-        milling_process = MillingProcess.query.get_or_404(process_id)
-        milling_process.name = data.get('name', milling_process.name)
-        milling_process.description = data.get('description', milling_process.description)
-        milling_process.video_link = data.get('video_link', milling_process.video_link)
-
-        db.session.commit()
-        return {'message': 'Milling process updated successfully'}, 200
-
-    @jwt_required()
-    @is_admin
-    def delete(self, process_id):
-        """Admin-only: Delete a milling process."""
-        milling_process = MillingProcess.query.get_or_404(process_id)
-        db.session.delete(milling_process)
-        db.session.commit()
-
-        return {'message': 'Milling process deleted successfully'}, 200
-
-class AggressionProcessResource(Resource):
-    @jwt_required(optional=True)
-    def get(self):
-        """View aggression processes."""
-        aggression_processes = AggressionProcess.query.all()
-        result = [
-            {
-                'id': process.id,
-                'name': process.name,
-                'description': process.description,
-                'video_link': process.video_link
-            } for process in aggression_processes
-        ]
-        return result, 200
-
-    @jwt_required()
-    @is_admin
-    def post(self):
-        """Admin-only: Add a new aggression process."""
-        data = request.get_json()
-
-        new_process = AggressionProcess(
-            name=data['name'],
-            description=data.get('description', ''),
-            video_link=data.get('video_link')
-        )
-
-        db.session.add(new_process)
-        db.session.commit()
+class SiteBundleResource(Resource):
+    query_budget = 10  # Section versions, About Us, then keys and changed rows of each list
 
-        return {'message': 'Aggression process added successfully'}, 201
-
-    @jwt_required()
-    @is_admin
-    def put(self, process_id):
-        """Admin-only: Update an existing aggression process."""
-        data = request.get_json()
-
-        aggression_process = AggressionProcess.query.get_or_404(process_id)
-        aggression_process.name = data.get('name', aggression_process.name)
-        aggression_process.description = data.get('description', aggression_process.description)
-        aggression_process.video_link = data.get('video_link', aggression_process.video_link)
-
-        db.session.commit()
-        return {'message': 'Aggression process updated successfully'}, 200
-
-    @jwt_required()
-    @is_admin
-    def delete(self, process_id):
-        """Admin-only: Delete an aggression process."""
-        aggression_process = AggressionProcess.query.get_or_404(process_id)
-        db.session.delete(aggression_process)
-        db.session.commit()
-
-        return {'message': 'Aggression process deleted successfully'}, 200
-
-
-class FarmProgressionResource(Resource):
-    @jwt_required(optional=True)
+    @swag_from({
+        'tags': ['Site'],
+        'summary': 'Everything the landing page needs, in one response',
+        'parameters': [
+            {'name': 'sections', 'in': 'query', 'type': 'string',
+             'description': f"Comma separated subset of {', '.join(SITE_BUNDLE_SECTIONS)}, "
+                            "each optionally with a row limit, e.g. products:5"},
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'description': 'Rows per list section'},
+        ],
+        'responses': {
+            200: {'description': 'One key per section: a list of rows, or the About Us object (null if missing)'},
+            304: {'description': 'Not modified'},
+            400: {'description': 'Invalid request'}
+        }
+    })
+    @replica_reads
+    @response_cache.cached(*(section.model for section in SITE_BUNDLE_SECTIONS.values()))
     def get(self):
-        """View farm progressions."""
-        farm_progressions = FarmProgression.query.all()
-        result = [
-            {
-                'id': progression.id,
-                'name': progression.name,
-                'description': progression.description,
-                'video_link': progression.video_link
-            } for progression in farm_progressions
-        ]
-        return result, 200
+        """View the about us, products, nurseries, announcements and how-to sections at once."""
+        return bundle_response(SITE_BUNDLE_SECTIONS)
 
-    @jwt_required()
-    @is_admin
-    def post(self):
-        """Admin-only: Add a new farm progression."""
-        data = request.get_json()
-
-        new_progression = FarmProgression(
-            name=data['name'],
-            description=data.get('description', ''),
-            video_link=data.get('video_link')
-        )
-
-        db.session.add(new_progression)
-        db.session.commit()
-
-        return {'message': 'Farm progression added successfully'}, 201
-
-    @jwt_required()
-    @is_admin
-    def put(self, progression_id):
-        """Admin-only: Update an existing farm progression."""
-        data = request.get_json()
 
-        farm_progression = FarmProgression.query.get_or_404(progression_id)
-        farm_progression.name = data.get('name', farm_progression.name)
-        farm_progression.description = data.get('description', farm_progression.description)
-        farm_progression.video_link = data.get('video_link', farm_progression.video_link)
+# Tables served by /api/changes, with the fields of their rows (those of the list endpoints)
+CHANGE_FEEDS = {
+    resource.spec.model.__tablename__: (resource.spec.model, resource.spec.fields)
+    for resource in (
+        ProductResource, NurseryResource, MillingProcessResource, AggressionProcessResource,
+        FarmProgressionResource, HowToResource, AnnouncementResource
+    )
+}
+CHANGE_FEEDS[AboutUs.__tablename__] = (AboutUs, ABOUT_US_FIELDS)
 
-        db.session.commit()
-        return {'message': 'Farm progression updated successfully'}, 200
-
-    @jwt_required()
-    @is_admin
-    def delete(self, progression_id):
-        """Admin-only: Delete a farm progression."""
-        farm_progression = FarmProgression.query.get_or_404(progression_id)
-        db.session.delete(farm_progression)
-        db.session.commit()
-
-        return {'message': 'Farm progression deleted successfully'}, 200
 
+class ChangesResource(Resource):
+    query_budget = 10  # The log page, the cursor check, then the changed rows of each table
 
-class HowToResource(Resource):
-    @jwt_required(optional=True)
+    @swag_from({
+        'tags': ['Sync'],
+        'summary': 'Content inserted, updated or deleted since a cursor',
+        'parameters': [
+            {'name': 'since', 'in': 'query', 'type': 'integer',
+             'description': 'The next value of the previous sync; omit it to get the current cursor only'},
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'description': 'Log entries read per request'},
+        ],
+        'responses': {
+            200: {'description': f"changes (seq, table, id, op upsert with data, or delete), next cursor and has_more; "
+                                 f"tables: {', '.join(CHANGE_FEEDS)}"},
+            400: {'description': 'Invalid request'},
+            410: {'description': 'The cursor was pruned from the log, fetch the full lists and sync from next'}
+        }
+    })
+    @replica_reads
     def get(self):
-        """View How To guides."""
-        how_to_guides = HowTo.query.all()
-        result = [
-            {
-                'id': guide.id,
-                'title': guide.title,
-                'content': guide.content
-            } for guide in how_to_guides
-        ]
-        return result, 200
-
-    @jwt_required()
-    @is_admin
-    def post(self):
-        """Admin-only: Add a new How To guide."""
-        data = request.get_json()
-
-        new_guide = HowTo(
-            title=data['title'],
-            content=data['content']
-        )
-
-        db.session.add(new_guide)
-        db.session.commit()
-
-        return {'message': 'How To guide added successfully'}, 201
-
-    @jwt_required()
-    @is_admin
-    def put(self, guide_id):
-        """Admin-only: Update an existing How To guide."""
-        data = request.get_json()
-
-        how_to_guide = HowTo.query.get_or_404(guide_id)
-        how_to_guide.title = data.get('title', how_to_guide.title)
-        how_to_guide.content = data.get('content', how_to_guide.content)
-
-        db.session.commit()
-        return {'message': 'How To guide updated successfully'}, 200
-
-    @jwt_required()
-    @is_admin
-    def delete(self, guide_id):
-        """Admin-only: Delete a How To guide."""
-        how_to_guide = HowTo.query.get_or_404(guide_id)
-        db.session.delete(how_to_guide)
-        db.session.commit()
+        """Download only what changed since the last sync."""
+        return changes_response(CHANGE_FEEDS)
 
-        return {'message': 'How To guide deleted successfully'}, 200
 
+class CacheStatsResource(Resource):
+    query_budget = 1
 
-class AnnouncementResource(Resource):
-    @jwt_required(optional=True)
+    @admin_required
     def get(self):
-        """View announcements."""
-        announcements = Announcement.query.all()
-        result = [
-            {
-                'id': announcement.id,
-                'title': announcement.title,
-                'content': announcement.content
-            } for announcement in announcements
-        ]
-        return result, 200
-
-    @jwt_required()
-    @is_admin
-    def post(self):
-        """Admin-only: Add a new announcement."""
-        data = request.get_json()
-
-        new_announcement = Announcement(
-            title=data['title'],
-            content=data['content']
-        )
-
-        db.session.add(new_announcement)
-        db.session.commit()
-
-        return {'message': 'Announcement added successfully'}, 201
-
-    @jwt_required()
-    @is_admin
-    def put(self, announcement_id):
-        """Admin-only: Update an existing announcement."""
-        data = request.get_json()
-
-        announcement = Announcement.query.get_or_404(announcement_id)
-        announcement.title = data.get('title', announcement.title)
-        announcement.content = data.get('content', announcement.content)
-
-        db.session.commit()
-        return {'message': 'Announcement updated successfully'}, 200
-
-    @jwt_required()
-    @is_admin
-    def delete(self, announcement_id):
-        """Admin-only: Delete an announcement."""
-        announcement = Announcement.query.get_or_404(announcement_id)
-        db.session.delete(announcement)
-        db.session.commit()
-
-        return {'message': 'Announcement deleted successfully'}, 200
+        """Admin-only: Response and row fragment cache hit/miss counters for this worker."""
+        return dict(response_cache.stats(), row_fragments=row_fragments.stats()), 200
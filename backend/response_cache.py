@@ -0,0 +1,279 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, has_app_context, request
+from flask_restful.representations.json import output_json
+from flask_restful.utils import unpack
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from compression import apply_encoding, compress, compressible, negotiate
+
+
+class LRUCache:
+    """
+    In-process least-recently-used cache with per-entry expiry.
+
+    Entries are local to one worker process, so other workers only see an
+    invalidation once their own copy expires. Use ``RedisCache`` when running
+    several workers.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._counters = {}  # Never evicted, losing a generation would revive stale entries
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """
+    Cache shared by every worker through a Redis server.
+
+    The ``redis`` package is only imported when this backend is selected.
+    """
+
+    def __init__(self, url, ttl=300, prefix='thunguri:'):
+        import redis
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def counter(self, key):
+        value = self._client.get(self.prefix + key)
+        return int(value) if value is not None else 0
+
+    def incr(self, key):
+        # Counters are stored as plain integers (not pickled) so INCR works on them
+        return self._client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+class ResponseCache:
+    """
+    Read-through cache for public GET responses.
+
+    Entries are keyed by route and query string plus the current generation
+    of every table the route reads. Committing a change to a table bumps its
+    generation, which orphans all cached responses built from it.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_BACKEND', 'lru')
+        app.config.setdefault('RESPONSE_CACHE_SIZE', 1024)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 300)
+        app.config.setdefault('RESPONSE_CACHE_REDIS_URL', None)
+
+        backend = app.config['RESPONSE_CACHE_BACKEND']
+        ttl = app.config['RESPONSE_CACHE_TTL']
+        if backend == 'redis':
+            store = RedisCache(app.config['RESPONSE_CACHE_REDIS_URL'], ttl=ttl)
+        elif backend == 'lru':
+            store = LRUCache(app.config['RESPONSE_CACHE_SIZE'], ttl=ttl)
+        elif backend in (None, 'null'):
+            store = None
+        else:
+            raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
+        app.extensions['response_cache'] = store
+
+    @property
+    def store(self):
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('response_cache')
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        """Return the hit/miss/invalidation counters of this process."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': current_app.config['RESPONSE_CACHE_BACKEND'],
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _key(self, store, table_names):
+        generations = ','.join(
+            f"{name}={store.counter('gen:' + name)}" for name in table_names
+        )
+        return f'resp:{generations}:{request.full_path}'
+
+    def invalidate(self, *table_names):
+        """
+        Drop every cached response that was built from the given tables.
+
+        Called automatically after each commit; Core statements that bypass
+        the ORM session must call it themselves.
+        """
+        store = self.store
+        if store is None:
+            return
+        for name in set(table_names):
+            store.incr('gen:' + name)
+            self._count('invalidations')
+
+    def _precompressed(self, store, key, response):
+        # The compressed body is stored next to the entry, under the same
+        # generations, so it is built once per content version and encoding
+        if not compressible(response) or len(response.get_data()) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = negotiate()
+        if encoding is None:
+            return response
+        variant_key = f'{key}|{encoding}'
+        body = store.get(variant_key)
+        if body is None:
+            body = compress(response.get_data(), encoding, cached=True)
+            store.set(variant_key, body)
+        return apply_encoding(response, body, encoding)
+
+    def cached(self, *models):
+        """
+        Decorator caching the successful responses of a resource GET.
+
+        Args:
+            *models (db.Model): Every model the handler reads from.
+        """
+        table_names = sorted(model.__tablename__ for model in models)
+
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                store = self.store
+                if store is None or request.method != 'GET':
+                    return fn(*args, **kwargs)
+
+                key = self._key(store, table_names)
+                entry = store.get(key)
+                if entry is not None:
+                    self._count('hits')
+                    status, headers, body = entry
+                    response = Response(body, status=status, headers=headers)
+                    response.headers['X-Cache'] = 'HIT'
+                    return self._precompressed(store, key, response.make_conditional(request))
+
+                self._count('misses')
+                response = _to_response(fn(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    store.set(key, (200, list(response.headers.items()), response.get_data()))
+                    response = self._precompressed(store, key, response)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+
+def _to_response(rv):
+    # Render a Flask-RESTful return value the same way Api.make_response would
+    if isinstance(rv, Response):
+        return rv
+    data, code, headers = unpack(rv)
+    response = output_json(data, code, headers)
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_tables(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state inside after_flush
+    changed = session.info.setdefault('cache_changed_tables', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            changed.add(table)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_tables(session):
+    changed = session.info.pop('cache_changed_tables', None)
+    if changed:
+        response_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_tables(session):
+    session.info.pop('cache_changed_tables', None)
+
+
+def invalidate_on_commit(session, *table_names):
+    """
+    Schedule cache invalidation for tables written with Core statements.
+
+    Core ``insert()``/``update()``/``delete()`` bypass the flush hooks, so
+    their writers register the tables here; invalidation happens after the
+    commit, exactly like ORM writes.
+    """
+    session.info.setdefault('cache_changed_tables', set()).update(table_names)
@@ -0,0 +1,106 @@
+import time
+from functools import partial, wraps
+
+from flask import Response, current_app, g, has_app_context
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Process-local time of the last commit that wrote rows; see recently_written()
+_last_write = 0.0
+
+
+class RoutingSession(FlaskSession):
+    """
+    Session sending reads to the replica bind while ``replica_reads`` is active.
+
+    The flag lives on the app context's ``g`` rather than on the session: a
+    streamed body runs after the request's session was removed, in a new
+    session of the same app context.
+
+    Flushes always go to the primary, and so does everything outside a
+    ``replica_reads`` handler. Models with their own ``__bind_key__`` keep it.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and has_app_context() and g.get('read_replica') and not self._flushing:
+            engines = self._db.engines
+            replica = engines.get(current_app.config['READ_REPLICA_BIND'])
+            if replica is not None and engine is engines.get(None):
+                return replica
+        return engine
+
+
+def _shared_store():
+    # The response cache backend doubles as cross-worker storage for the write fence
+    return current_app.extensions.get('response_cache')
+
+
+def recently_written():
+    """
+    True if a commit wrote rows less than ``READ_YOUR_WRITES_SECONDS`` ago.
+
+    The fence is global rather than per user: writes are rare admin edits,
+    and a replica read right after any write could also store lagging data
+    in the response cache under the table's new generation.
+    """
+    window = current_app.config['READ_YOUR_WRITES_SECONDS']
+    if time.monotonic() - _last_write < window:
+        return True
+    store = _shared_store()
+    last = store.get('rw:last_write') if store is not None else None
+    return last is not None and time.time() - last < window
+
+
+def replica_reads(fn):
+    """
+    Decorator routing a public GET handler's queries to the read replica.
+
+    Falls back to the primary when no replica bind is configured or inside
+    the read-your-writes window after a commit. A streamed response runs its
+    queries while the body is sent, so it keeps the routing until it is closed.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        db = current_app.extensions['sqlalchemy']  # models.py imports this module
+        if current_app.config['READ_REPLICA_BIND'] not in db.engines or recently_written():
+            return fn(*args, **kwargs)
+        g.read_replica = True
+        streamed = False
+        try:
+            response = fn(*args, **kwargs)
+            streamed = isinstance(response, Response) and response.is_streamed
+            if streamed:
+                response.call_on_close(partial(g._get_current_object().pop, 'read_replica', None))
+            return response
+        finally:
+            if not streamed:
+                g.pop('read_replica', None)
+    return wrapper
+
+
+def mark_written(session):
+    """Open the read-your-writes window when ``session`` commits (Core writes bypass flush)."""
+    session.info['routing_wrote'] = True
+
+
+@event.listens_for(Session, 'after_flush')
+def _flag_write(session, flush_context):
+    mark_written(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _record_write(session):
+    global _last_write
+    if not session.info.pop('routing_wrote', False) or not has_app_context():
+        return
+    _last_write = time.monotonic()
+    store = _shared_store()
+    if store is not None:
+        store.set('rw:last_write', time.time(), ttl=current_app.config['READ_YOUR_WRITES_SECONDS'])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('routing_wrote', None)
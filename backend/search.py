@@ -0,0 +1,192 @@
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from sqlalchemy import text
+
+from models import db, Product, Nursery, HowTo, Announcement
+from pagination import PaginationError, parse_int
+from response_cache import response_cache
+from routing import replica_reads
+from apidocs import swag_from
+
+
+class SearchIndex:
+    """
+    An FTS5 index over the text columns of one content table.
+
+    The index uses the content table as external content, so the text is not
+    stored twice; triggers keep it in sync with every write, including Core
+    bulk statements that bypass the ORM.
+    """
+
+    def __init__(self, type_name, model, columns):
+        self.type_name = type_name
+        self.model = model
+        self.table = model.__tablename__
+        self.fts_table = f'{self.table}_fts'
+        self.columns = tuple(columns)
+
+    @property
+    def title_column(self):
+        return self.columns[0]
+
+    def ddl(self):
+        """Statements creating the FTS table and its sync triggers."""
+        cols = ', '.join(self.columns)
+        new_values = ', '.join(f'new.{col}' for col in self.columns)
+        old_values = ', '.join(f'old.{col}' for col in self.columns)
+        fts = self.fts_table
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{self.table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {self.table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {self.table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+            # Only reindex when an indexed column changes, not on version bumps
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {self.table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        ]
+
+    def select_sql(self):
+        """Ranked match query for this index, used as one branch of the search UNION."""
+        fts = self.fts_table
+        return (
+            f"SELECT '{self.type_name}' AS type, {fts}.rowid AS id, "
+            f"{self.table}.{self.title_column} AS title, "
+            f"snippet({fts}, -1, '<mark>', '</mark>', '…', 12) AS snippet, "
+            f"bm25({fts}) AS score "
+            f"FROM {fts} JOIN {self.table} ON {self.table}.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :q"
+        )
+
+
+# Searchable content, keyed by the type name used in ?types= and in results
+SEARCH_INDEXES = {
+    index.type_name: index for index in (
+        SearchIndex('product', Product, ('name', 'description')),
+        SearchIndex('nursery', Nursery, ('name', 'description')),
+        SearchIndex('how_to', HowTo, ('title', 'content')),
+        SearchIndex('announcement', Announcement, ('title', 'description')),
+    )
+}
+
+
+def fts_query(raw):
+    """
+    Turn free text into a safe FTS5 query.
+
+    Every word is quoted (so FTS5 operators in user input are matched as
+    text) and prefix-matched; words are ANDed together.
+
+    Returns:
+        str: The MATCH expression, or an empty string if there is no word.
+    """
+    terms = [term.replace('"', '') for term in raw.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    Alembic autogenerate filter hiding the FTS5 tables and their shadow tables.
+
+    They are created by raw DDL and have no model, so autogenerate would
+    otherwise emit ``drop_table`` for them.
+    """
+    if type_ == 'table' and reflected and compare_to is None:
+        return not any(
+            name == index.fts_table or name.startswith(index.fts_table + '_')
+            for index in SEARCH_INDEXES.values()
+        )
+    return True
+
+
+def create_search_schema(connection):
+    """Create any missing FTS table or trigger."""
+    for index in SEARCH_INDEXES.values():
+        for statement in index.ddl():
+            connection.execute(text(statement))
+
+
+def rebuild_search_index(connection):
+    """Recreate every FTS index from its content table."""
+    create_search_schema(connection)
+    for index in SEARCH_INDEXES.values():
+        connection.execute(text(f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('rebuild')"))
+
+
+class SearchResource(Resource):
+    query_budget = 1  # One UNION ALL over the requested indexes
+
+    @swag_from({
+        'tags': ['Search'],
+        'parameters': [
+            {'name': 'q', 'in': 'query', 'type': 'string', 'required': True, 'description': 'Words to find (prefix match)'},
+            {'name': 'types', 'in': 'query', 'type': 'string', 'description': f"Comma separated subset of: {', '.join(SEARCH_INDEXES)}"},
+            {'name': 'limit', 'in': 'query', 'type': 'integer'},
+            {'name': 'offset', 'in': 'query', 'type': 'integer'}
+        ],
+        'responses': {
+            200: {'description': 'Ranked results with highlighted snippets and next_offset'},
+            400: {'description': 'Missing query or invalid parameters'},
+            501: {'description': 'Database without FTS5'}
+        }
+    })
+    @jwt_required(optional=True)
+    @replica_reads
+    @response_cache.cached(*(index.model for index in SEARCH_INDEXES.values()))
+    def get(self):
+        """Full-text search over products, nurseries, how-to guides and announcements."""
+        if db.engine.dialect.name != 'sqlite':
+            return {'error': 'Search requires the SQLite FTS5 backend'}, 501
+
+        match = fts_query(request.args.get('q', ''))
+        if not match:
+            return {'error': "Missing search query 'q'"}, 400
+
+        types = request.args.get('types')
+        if types:
+            names = [name.strip() for name in types.split(',') if name.strip()]
+            unknown = [name for name in names if name not in SEARCH_INDEXES]
+            if unknown:
+                return {'error': f"Unknown type(s): {', '.join(unknown)}"}, 400
+            indexes = [SEARCH_INDEXES[name] for name in names]
+        else:
+            indexes = list(SEARCH_INDEXES.values())
+
+        try:
+            limit = parse_int('limit', 1)
+            offset = parse_int('offset', 0) or 0
+        except PaginationError as e:
+            return {'error': str(e)}, 400
+        limit = min(limit or current_app.config['SEARCH_DEFAULT_LIMIT'], current_app.config['SEARCH_MAX_LIMIT'])
+
+        sql = ' UNION ALL '.join(index.select_sql() for index in indexes)
+        sql += ' ORDER BY score LIMIT :limit OFFSET :offset'
+        # One extra row tells us whether there is a next page
+        rows = db.session.execute(text(sql), {'q': match, 'limit': limit + 1, 'offset': offset}).all()
+
+        results = [
+            {'type': row.type, 'id': row.id, 'title': row.title,
+             'snippet': row.snippet, 'score': round(-row.score, 4)}
+            for row in rows[:limit]
+        ]
+        return {
+            'query': request.args.get('q'),
+            'results': results,
+            'next_offset': offset + limit if len(rows) > limit else None
+        }, 200
+
+
+search_cli = AppGroup('search', help='Manage the full-text search index.')
+
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Create missing FTS tables/triggers and rebuild every index."""
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
+    click.echo(f"Rebuilt search index for: {', '.join(SEARCH_INDEXES)}")
@@ -0,0 +1,245 @@
+import hashlib
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Media, Nursery, Product, FarmProgression
+
+# Columns holding media paths; they keep Media.ref_count up to date
+MEDIA_COLUMNS = (
+    (Nursery, 'photo_path'),
+    (Product, 'image_path'),
+    (FarmProgression, 'photo_path'),
+)
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    """Raised when an upload is rejected (type or size)."""
+
+
+def _extension(filename):
+    if not filename or '.' not in filename:
+        return None
+    ext = filename.rsplit('.', 1)[1].lower()
+    return 'jpg' if ext == 'jpeg' else ext
+
+
+def media_path(sha256, ext):
+    """Sharded relative path of a blob, e.g. ``ab/cd/abcd….jpg``."""
+    return os.path.join(sha256[:2], sha256[2:4], f'{sha256}.{ext}')
+
+
+def absolute_path(relative_path, upload_folder=None):
+    """Resolve a stored media path against the upload folder."""
+    return os.path.join(upload_folder or current_app.config['UPLOAD_FOLDER'], relative_path)
+
+
+def store_upload(file, upload_folder=None):
+    """
+    Store an uploaded file under its content hash.
+
+    The upload is streamed to a temporary file while it is hashed, then moved
+    into its sharded location. If the same content was stored before, the
+    temporary file is discarded and the existing blob is reused. New images
+    are stored without their metadata (see ``images.strip_metadata``); the
+    hash stays that of the uploaded bytes, so re-uploads still deduplicate.
+
+    Args:
+        file (FileStorage): The uploaded file.
+        upload_folder (str): Storage root, defaults to ``UPLOAD_FOLDER``.
+
+    Returns:
+        str: The media path to save on the owning row.
+
+    Raises:
+        UploadError: If the file type is not allowed or the file is too large.
+    """
+    upload_folder = upload_folder or current_app.config['UPLOAD_FOLDER']
+    ext = _extension(file.filename)
+    if ext not in current_app.config['ALLOWED_PHOTO_EXTENSIONS']:
+        raise UploadError('Invalid image format')
+
+    max_size = current_app.config['MAX_PHOTO_SIZE']
+    tmp_dir = os.path.join(upload_folder, '.tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadError(f'Image exceeds the {max_size // (1024 * 1024)} MB limit')
+                digest.update(chunk)
+                out.write(chunk)
+
+        sha256 = digest.hexdigest()
+        existing = db.session.execute(select(Media.path).where(Media.sha256 == sha256)).scalar()
+        if existing:
+            return existing  # Duplicate content, nothing new to write
+
+        from images import strip_metadata  # images imports this module
+        strip_metadata(tmp_path)  # Originals are served publicly: no GPS or camera data
+        size = os.path.getsize(tmp_path)
+
+        path = media_path(sha256, ext)
+        target = absolute_path(path, upload_folder)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+        tmp_path = None
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(Media(sha256=sha256, path=path, size=size, content_type=file.mimetype))
+        except IntegrityError:
+            pass  # A concurrent upload of the same content registered it first
+        return path
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _adjust_refs(connection, path, delta):
+    if path:
+        connection.execute(
+            update(Media.__table__)
+            .where(Media.__table__.c.path == path)
+            .values(ref_count=Media.__table__.c.ref_count + delta)
+        )
+
+
+def _register_ref_counting(model, attribute):
+    @event.listens_for(model, 'after_insert')
+    def after_insert(mapper, connection, target):
+        _adjust_refs(connection, getattr(target, attribute), 1)
+
+    @event.listens_for(model, 'after_update')
+    def after_update(mapper, connection, target):
+        history = inspect(target).attrs[attribute].history
+        if history.has_changes():
+            for old in history.deleted:
+                _adjust_refs(connection, old, -1)
+            for new in history.added:
+                _adjust_refs(connection, new, 1)
+
+    @event.listens_for(model, 'after_delete')
+    def after_delete(mapper, connection, target):
+        _adjust_refs(connection, getattr(target, attribute), -1)
+
+
+for _model, _attribute in MEDIA_COLUMNS:
+    _register_ref_counting(_model, _attribute)
+
+
+def collect_garbage(upload_folder=None, grace_seconds=None, dry_run=False):
+    """
+    Recount media references and delete unreferenced blobs.
+
+    Reference counts are recomputed from the referencing columns, which also
+    repairs counts skipped by Core bulk writes. A blob's image variants share
+    its hash prefix and go with it. Blobs younger than the grace period are
+    kept so uploads whose row is not committed yet survive.
+
+    Returns:
+        list: Relative paths of the removed (or, with ``dry_run``, removable) files.
+    """
+    upload_folder = upload_folder or current_app.config['UPLOAD_FOLDER']
+    if grace_seconds is None:
+        grace_seconds = current_app.config['MEDIA_GC_GRACE_SECONDS']
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+
+    references = Counter()
+    for model, attribute in MEDIA_COLUMNS:
+        column = getattr(model, attribute)
+        references.update(db.session.execute(select(column).where(column.isnot(None))).scalars())
+
+    live = set()
+    dead = set()
+    for media in db.session.execute(select(Media)).scalars():
+        media.ref_count = references.get(media.path, 0)
+        if media.ref_count == 0 and media.created_at < cutoff:
+            dead.add(media.sha256)
+            if not dry_run:
+                db.session.delete(media)
+        else:
+            live.add(media.sha256)
+
+    # Blobs of deleted media and their image variants (<sha256>_w320.webp, ...),
+    # files left behind by uploads whose transaction never committed, and
+    # temporary files of interrupted uploads
+    removed = []
+    cutoff_ts = time.time() - grace_seconds
+    for root, dirs, files in os.walk(upload_folder):
+        for name in files:
+            full = os.path.join(root, name)
+            relative = os.path.relpath(full, upload_folder)
+            sha256 = name.split('.', 1)[0].split('_', 1)[0]
+            if relative.count(os.sep) == 2 and sha256 in dead:
+                removed.append(relative)
+            elif os.path.getmtime(full) >= cutoff_ts:
+                continue
+            elif relative.startswith('.tmp' + os.sep):
+                removed.append(relative)
+            elif relative.count(os.sep) == 2 and sha256 not in live:
+                removed.append(relative)
+
+    if dry_run:
+        db.session.rollback()
+        return removed
+
+    db.session.commit()
+    for relative in removed:
+        full = absolute_path(relative, upload_folder)
+        if os.path.exists(full):
+            os.remove(full)
+    return removed
+
+
+media_cli = AppGroup('media', help='Manage uploaded media.')
+
+
+@media_cli.command('gc')
+@click.option('--dry-run', is_flag=True, help='Only list the files that would be removed.')
+def gc_command(dry_run):
+    """Delete uploaded files no Nursery, Product or FarmProgression references."""
+    removed = collect_garbage(dry_run=dry_run)
+    verb = 'Would remove' if dry_run else 'Removed'
+    for path in removed:
+        click.echo(f'{verb} {path}')
+    click.echo(f'{verb} {len(removed)} file(s)')
+
+
+@media_cli.command('strip')
+def strip_command():
+    """Remove metadata from originals stored before uploads were stripped."""
+    from images import strip_metadata  # images imports this module
+
+    stripped = 0
+    for media in db.session.execute(select(Media)).scalars():
+        full = absolute_path(media.path)
+        if not os.path.exists(full):
+            continue
+        try:
+            strip_metadata(full)
+        except UploadError:
+            click.echo(f'Skipped {media.path}: not a readable image')
+            continue
+        media.size = os.path.getsize(full)
+        stripped += 1
+    db.session.commit()
+    click.echo(f'Stripped {stripped} file(s)')
@@ -0,0 +1,52 @@
+import pytest
+
+from app import create_app
+from auth import forget_user
+from config import Config
+from models import db
+from search import rebuild_search_index
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Build an API app on a fresh in-memory database.
+
+    Every cache is off so each request runs all of its queries, and
+    ``QUERY_AUDIT_MODE='raise'`` fails any request over its budget.
+    Keyword arguments override config values.
+    """
+    def make(**overrides):
+        config = type('TestConfig', (Config,), dict({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_BINDS': {},
+            'UPLOAD_FOLDER': str(tmp_path / 'uploads'), 'IMAGE_EXECUTOR': 'sync',
+            'RESPONSE_CACHE_BACKEND': 'null', 'ROW_CACHE_SIZE': 0, 'METRICS_MODE': 'off',
+            'QUERY_AUDIT_MODE': 'raise', 'API_DOCS_MODE': 'off', 'JWT_SECRET_KEY': 'test-secret-key-of-at-least-32-bytes',
+        }, **overrides))
+        app = create_app(config, role='api')
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                rebuild_search_index(connection)
+        forget_user(1)  # The admin status cache outlives the app
+        return app
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(client):
+    """Register the admin and return the headers of its access token."""
+    credentials = {'email': 'admin@example.invalid', 'password': 'admin'}
+    client.post('/api/register', json=dict(credentials, username='admin'))
+    token = client.post('/api/login', json=credentials).get_json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
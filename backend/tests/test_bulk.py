@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import select
+
+from models import db, Product
+from query_audit import capture_queries
+
+
+@pytest.fixture
+def app(make_app):
+    # The batch split into several INSERTs below runs more statements than a real batch's budget
+    return make_app(QUERY_AUDIT_MODE='off')
+
+
+def _names(app, ids):
+    with app.app_context():
+        rows = db.session.execute(select(Product.id, Product.name, Product.description).where(Product.id.in_(ids)))
+        return {row.id: (row.name, row.description) for row in rows}
+
+
+def _create(client, admin_headers, count):
+    items = [{'name': f'product {n}', 'description': f'description {n}'} for n in range(count)]
+    response = client.post('/api/products/bulk', json=items, headers=admin_headers)
+    assert response.status_code == 201
+    return [result['id'] for result in response.get_json()['results']]
+
+
+def test_bulk_post_across_statements_maps_ids_to_items(app, client, admin_headers, monkeypatch):
+    with app.app_context():
+        # 5 parameters per row (3 writable fields, version, updated_at): 4 rows per INSERT
+        monkeypatch.setattr(db.engine.dialect, 'insertmanyvalues_max_parameters', 20)
+    items = [{'name': f'product {n}', 'description': f'description {n}'} for n in range(10)]
+
+    with capture_queries() as statements:
+        response = client.post('/api/products/bulk', json=items, headers=admin_headers)
+    assert response.status_code == 201
+    assert sum(sql.startswith('INSERT INTO products') for sql, _ in statements) == 3
+
+    results = response.get_json()['results']
+    assert [result['index'] for result in results] == list(range(10))
+    assert all(result['status'] == 201 for result in results)
+    stored = _names(app, [result['id'] for result in results])
+    for result, item in zip(results, items):
+        assert stored[result['id']] == (item['name'], item['description'])
+
+
+def test_bulk_put_updates_each_item(app, client, admin_headers):
+    ids = _create(client, admin_headers, 4)
+    # Two field sets: each group is its own executemany
+    items = [{'id': ids[0], 'name': 'renamed 0'}, {'id': ids[1], 'description': 'new 1'},
+             {'id': ids[2], 'name': 'renamed 2'}]
+    response = client.put('/api/products/bulk', json=items, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['results'] == [
+        {'index': index, 'id': item['id'], 'status': 200} for index, item in enumerate(items)
+    ]
+    assert _names(app, ids) == {
+        ids[0]: ('renamed 0', 'description 0'),
+        ids[1]: ('product 1', 'new 1'),
+        ids[2]: ('renamed 2', 'description 2'),
+        ids[3]: ('product 3', 'description 3'),
+    }
+
+
+def test_bulk_put_reports_invalid_items_and_writes_nothing(app, client, admin_headers):
+    ids = _create(client, admin_headers, 2)
+    items = [{'id': ids[0], 'name': 'renamed'}, {'id': 9999, 'name': 'x'}, {'name': 'no id'}]
+    response = client.put('/api/products/bulk', json=items, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['results'] == [
+        {'index': 1, 'id': 9999, 'error': 'Not found'},
+        {'index': 2, 'error': 'Missing or invalid id'},
+    ]
+    assert _names(app, ids)[ids[0]] == ('product 0', 'description 0')
+
+
+def test_bulk_delete_removes_each_item(app, client, admin_headers):
+    ids = _create(client, admin_headers, 3)
+    response = client.delete('/api/products/bulk', json={'ids': ids[:2]}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['results'] == [
+        {'index': 0, 'id': ids[0], 'status': 200}, {'index': 1, 'id': ids[1], 'status': 200}
+    ]
+    assert list(_names(app, ids)) == [ids[2]]
+
+
+def test_bulk_delete_with_unknown_id_deletes_nothing(app, client, admin_headers):
+    ids = _create(client, admin_headers, 2)
+    response = client.delete('/api/products/bulk', json={'ids': [ids[0], 9999]}, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['results'] == [{'index': 1, 'id': 9999, 'error': 'Not found'}]
+    assert sorted(_names(app, ids)) == ids
@@ -0,0 +1,58 @@
+from changelog import prune_command
+
+
+def _cursor(client):
+    response = client.get('/api/changes')
+    assert response.status_code == 200
+    return response.get_json()['next']
+
+
+def test_insert_update_delete_collapse_to_one_tombstone(client, admin_headers):
+    since = _cursor(client)
+    product_id = client.post('/api/products', json={'name': 'new'}, headers=admin_headers).get_json()['id']
+    client.put(f'/api/products/{product_id}', json={'name': 'renamed'}, headers=admin_headers)
+    client.delete(f'/api/products/{product_id}', headers=admin_headers)
+
+    body = client.get(f'/api/changes?since={since}').get_json()
+    assert [(change['table'], change['id'], change['op']) for change in body['changes']] == [
+        ('products', product_id, 'delete')
+    ]
+    assert 'data' not in body['changes'][0]
+    assert body['next'] == body['changes'][0]['seq'] == since + 3
+    assert body['has_more'] is False
+
+
+def test_insert_and_update_collapse_to_the_latest_row(client, admin_headers):
+    since = _cursor(client)
+    product_id = client.post('/api/products', json={'name': 'new'}, headers=admin_headers).get_json()['id']
+    client.put(f'/api/products/{product_id}', json={'name': 'renamed'}, headers=admin_headers)
+
+    changes = client.get(f'/api/changes?since={since}').get_json()['changes']
+    assert len(changes) == 1
+    assert changes[0]['op'] == 'upsert'
+    assert changes[0]['data']['name'] == 'renamed'
+
+
+def test_cursor_below_pruned_log_is_gone(app, client, admin_headers):
+    for name in ('first', 'second', 'third'):
+        client.post('/api/products', json={'name': name}, headers=admin_headers)
+    head = _cursor(client)
+
+    result = app.test_cli_runner().invoke(prune_command, ['--older-than', '0'])
+    assert result.exit_code == 0, result.output
+
+    response = client.get('/api/changes?since=1')
+    assert response.status_code == 410
+    assert response.get_json()['next'] == head
+    # The kept head is still a valid cursor
+    assert client.get(f'/api/changes?since={head}').status_code == 200
+
+
+def test_cursor_past_head_gets_an_empty_delta(client, admin_headers):
+    client.post('/api/products', json={'name': 'only'}, headers=admin_headers)
+    head = _cursor(client)
+
+    for since in (head, head + 5):
+        response = client.get(f'/api/changes?since={since}')
+        assert response.status_code == 200
+        assert response.get_json() == {'changes': [], 'next': since, 'has_more': False}
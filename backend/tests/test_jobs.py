@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from jobs import claim, enqueue, jobs, run_job, task
+from models import db
+
+
+@task(name='tests.noop')
+def noop():
+    pass
+
+
+@task(name='tests.broken', max_attempts=3)
+def broken():
+    raise RuntimeError('always broken')
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+def _enqueue(task):
+    job_id = enqueue(task)
+    db.session.commit()
+    return job_id
+
+
+def _job(job_id):
+    return db.session.execute(select(jobs).where(jobs.c.id == job_id)).one()
+
+
+def _make_runnable(job_id):
+    # Stands in for waiting out the retry backoff
+    db.session.execute(update(jobs).where(jobs.c.id == job_id).values(run_at=datetime.utcnow()))
+    db.session.commit()
+
+
+def test_expired_lease_is_claimed_again(app_context):
+    job_id = _enqueue(noop)
+    assert claim('first').id == job_id
+    assert claim('second') is None  # Still leased to the first worker
+
+    db.session.execute(
+        update(jobs).where(jobs.c.id == job_id).values(locked_until=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.session.commit()
+    job = claim('second')
+    assert job.id == job_id
+    assert job.attempts == 2
+    assert _job(job_id).locked_by == 'second'
+
+    run_job(job, 'second')
+    assert _job(job_id).status == 'done'
+
+
+def test_retry_pushes_run_at_forward(app, app_context):
+    job_id = _enqueue(broken)
+    base = app.config['JOBS_BACKOFF_BASE']
+    for attempt in (1, 2):
+        before = datetime.utcnow()
+        assert run_job(claim('worker'), 'worker') is False
+        job = _job(job_id)
+        assert job.status == 'queued'
+        assert job.locked_by is None
+        # Exponential backoff with jitter: between half and all of base * 2 ** (attempt - 1)
+        delay = base * 2 ** (attempt - 1)
+        assert before + timedelta(seconds=delay * 0.5) <= job.run_at <= datetime.utcnow() + timedelta(seconds=delay)
+        assert claim('worker') is None  # Not before run_at
+        _make_runnable(job_id)
+
+
+def test_job_failing_every_attempt_ends_failed(app_context):
+    job_id = _enqueue(broken)
+    for attempt in range(1, 4):
+        job = claim('worker')
+        assert job.attempts == attempt
+        assert run_job(job, 'worker') is False
+        _make_runnable(job_id)
+
+    job = _job(job_id)
+    assert job.status == 'failed'
+    assert job.attempts == job.max_attempts == 3
+    assert 'RuntimeError: always broken' in job.last_error
+    assert job.finished_at is not None
+    assert claim('worker') is None
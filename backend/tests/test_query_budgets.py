@@ -0,0 +1,11 @@
+import pytest
+
+from query_plans import check_budgets
+
+
+@pytest.mark.parametrize('executor', ['sync', 'jobs'])
+def test_every_route_stays_within_its_query_budget(make_app, executor):
+    # The routes `flask db audit-budgets` replays, checked by assert_queries rather than the audit hooks
+    app = make_app(IMAGE_EXECUTOR=executor, QUERY_AUDIT_MODE='off')
+    failures = [f'{label}: {problem}' for label, count, budget, problem in check_budgets(app) if problem]
+    assert not failures, '\n'.join(failures)
@@ -1,6 +1,6 @@
 import os
-from werkzeug.utils import secure_filename
-from PIL import Image
+
+from storage import UploadError, store_upload
 
 # Allowed image extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
@@ -19,20 +19,20 @@ def allowed_photo(filename):
 
 def save_photo(file, upload_folder):
     """
-    Save a photo file to the specified upload folder.
+    Save a photo file to the content-addressed store under the upload folder.
 
     Args:
         file (FileStorage): The image file to be saved.
-        upload_folder (str): Directory to save the file.
+        upload_folder (str): Root of the media store.
 
     Returns:
-        str: Path to the saved image or None if invalid.
+        str: Media path of the saved image (relative to the upload folder) or None if invalid.
     """
     if file and allowed_photo(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        return file_path
+        try:
+            return store_upload(file, upload_folder)
+        except UploadError:
+            return None
     return None
 
 def create_thumbnail(file_path, thumbnail_size=(100, 100)):
@@ -46,6 +46,8 @@ def create_thumbnail(file_path, thumbnail_size=(100, 100)):
     Returns:
         str: Path to the saved thumbnail or None on failure.
     """
+    from PIL import Image  # Imported on first use, keeps Pillow out of worker start-up
+
     try:
         with Image.open(file_path) as img:
             img.thumbnail(thumbnail_size)
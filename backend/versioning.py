@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import db, TableVersion, VersionedMixin
+
+_table = TableVersion.__table__
+
+
+def bump_table_versions(connection, table_names, now=None):
+    """
+    Increment the version counter of the given tables.
+
+    Core statements (bulk writes, raw SQL) bypass the ORM session hooks and
+    must call this themselves, on the same connection, to keep ETags honest.
+
+    Args:
+        connection (Connection): Connection of the writing transaction.
+        table_names (iterable): Names of the modified tables.
+        now (datetime): Modification time, defaults to the current UTC time.
+    """
+    now = now or datetime.utcnow()
+    for name in sorted(set(table_names)):
+        result = connection.execute(
+            update(_table)
+            .where(_table.c.table_name == name)
+            .values(version=_table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(_table).values(table_name=name, version=1, updated_at=now))
+
+
+def get_table_version(model):
+    """
+    Return the ``(version, updated_at)`` pair of a model's table.
+
+    Args:
+        model (db.Model): A ``VersionedMixin`` model.
+
+    Returns:
+        tuple: ``(0, None)`` if the table was never written to.
+    """
+    row = db.session.execute(
+        select(_table.c.version, _table.c.updated_at)
+        .where(_table.c.table_name == model.__tablename__)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def get_table_versions(models):
+    """
+    Return the ``(version, updated_at)`` pairs of several tables in one query.
+
+    Args:
+        models (iterable): ``VersionedMixin`` models.
+
+    Returns:
+        dict: Table name to pair, ``(0, None)`` for tables never written to.
+    """
+    names = [model.__tablename__ for model in models]
+    rows = db.session.execute(
+        select(_table.c.table_name, _table.c.version, _table.c.updated_at)
+        .where(_table.c.table_name.in_(names))
+    )
+    found = {row.table_name: (row.version, row.updated_at) for row in rows}
+    return {name: found.get(name, (0, None)) for name in names}
+
+
+def get_row_version(model, row_id):
+    """
+    Return the ``(version, updated_at)`` pair of a single row.
+
+    Only the two tracking columns are selected, the row itself is not loaded.
+
+    Returns:
+        tuple: ``None`` if the row does not exist.
+    """
+    row = db.session.execute(
+        select(model.version, model.updated_at).where(model.id == row_id)
+    ).first()
+    return (row.version, row.updated_at) if row else None
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_versions(session, flush_context, instances):
+    now = datetime.utcnow()
+    touched = session.info.setdefault('touched_tables', set())
+
+    for obj in session.new:
+        if isinstance(obj, VersionedMixin):
+            obj.updated_at = now
+            touched.add(obj.__tablename__)
+
+    for obj in session.dirty:
+        if isinstance(obj, VersionedMixin) and session.is_modified(obj):
+            obj.version = (obj.version or 0) + 1
+            obj.updated_at = now
+            touched.add(obj.__tablename__)
+
+    for obj in session.deleted:
+        if isinstance(obj, VersionedMixin):
+            touched.add(obj.__tablename__)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_touched_tables(session, flush_context):
+    touched = session.info.pop('touched_tables', None)
+    if touched:
+        bump_table_versions(session.connection(), touched)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_touched_tables(session):
+    session.info.pop('touched_tables', None)